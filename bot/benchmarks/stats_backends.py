@@ -0,0 +1,158 @@
+"""Performances des backends de statistiques
+
+Rejoue la même charge synthétique sur chaque backend (memory, json,
+sqlite) et mesure la latence par opération (p50/p95/p99) et le pic de
+mémoire (RSS) de chaque backend, dans un processus séparé. La
+conformité des backends est vérifiée par tests/test_stats_backends.py.
+
+Utilisation (depuis le dossier bot) :
+    python benchmarks/stats_backends.py
+    python benchmarks/stats_backends.py --users 10000 --downloads 100000 --backends memory sqlite
+"""
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+# Ajouter le dossier parent au path pour importer utils
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PLATFORMS = ("instagram", "pinterest", "tiktok")
+
+
+def make_backend(name: str, workdir: str):
+    """Instancie un backend dont les fichiers vivent dans `workdir`"""
+    from utils.stats_manager import MemoryStatsManager, StatsManager
+    from utils.stats_sqlite import SQLiteStatsManager
+
+    if name == "memory":
+        return MemoryStatsManager()
+    if name == "json":
+        return StatsManager(os.path.join(workdir, "stats.json"))
+    if name == "sqlite":
+        return SQLiteStatsManager(os.path.join(workdir, "stats.sqlite3"))
+    raise ValueError(f"Backend inconnu : {name}")
+
+
+def synthetic_downloads(users: int, downloads: int, seed: int = 42):
+    """Téléchargements (user_id, platform, url) : quelques vidéos très populaires, une longue traîne"""
+    rng = random.Random(seed)
+    videos = max(downloads // 10, 1)
+    for _ in range(downloads):
+        video = int(rng.paretovariate(1.2)) % videos
+        yield rng.randint(1, users), PLATFORMS[video % len(PLATFORMS)], f"https://example.com/v/{video}"
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    pick = lambda q: samples[min(int(q * len(samples)), len(samples) - 1)] * 1000  # noqa: E731
+    return {"n": len(samples), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": samples[-1] * 1000}
+
+
+async def record_all(backend, workload, timings: List[float] = None):
+    """Enregistre la charge ; rend la main à la boucle tous les 100 appels pour l'écriture différée"""
+    for i, (user_id, platform, url) in enumerate(workload, start=1):
+        start = time.perf_counter()
+        await backend.record_download(user_id, f"user{user_id}", platform, url, f"Vidéo {url}")
+        if timings is not None:
+            timings.append(time.perf_counter() - start)
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+
+
+async def benchmark(name: str, users: int, downloads: int) -> Dict:
+    rng = random.Random(1)
+    timings: Dict[str, List[float]] = {"record_download": []}
+    with tempfile.TemporaryDirectory() as workdir:
+        backend = make_backend(name, workdir)
+        started = time.perf_counter()
+        await record_all(backend, synthetic_downloads(users, downloads), timings["record_download"])
+        start = time.perf_counter()
+        await backend.checkpoint()
+        timings["checkpoint"] = [time.perf_counter() - start]
+        ingest_s = time.perf_counter() - started
+
+        reads: List[Tuple[str, callable]] = [
+            ("get_user_stats", lambda: backend.get_user_stats(rng.randint(1, users))),
+            ("get_user_rank", lambda: backend.get_user_rank(rng.randint(1, users))),
+            ("get_top_users", lambda: backend.get_top_users(10)),
+            ("get_top_videos", lambda: backend.get_top_videos(10)),
+            ("get_global_stats", lambda: backend.get_global_stats()),
+        ]
+        for op, call in reads:
+            timings[op] = []
+            for _ in range(1000):
+                start = time.perf_counter()
+                await call()
+                timings[op].append(time.perf_counter() - start)
+
+        # Snapshot après écriture (lectures d'un /leaderboard) : mesure le coût hors cache
+        timings["snapshot"] = []
+        for user_id, platform, url in synthetic_downloads(users, 100, seed=3):
+            await backend.record_download(user_id, f"user{user_id}", platform, url)
+            await backend.checkpoint()
+            start = time.perf_counter()
+            snapshot = await backend.snapshot()
+            await snapshot.get_top_users(10)
+            await snapshot.get_user_rank(user_id)
+            await snapshot.get_user_stats(user_id)
+            timings["snapshot"].append(time.perf_counter() - start)
+
+        writer = backend.get_writer_metrics()
+        await backend.close()
+
+    import resource
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024  # octets sous macOS
+    return {
+        "ops": {op: percentiles(samples) for op, samples in timings.items()},
+        "ingest_s": ingest_s,
+        "max_flush_ms": writer["max_flush_ms"],
+        "peak_rss_mb": peak_kb / 1024,
+    }
+
+
+def _run_isolated(name: str, users: int, downloads: int, results):
+    """Point d'entrée du processus enfant (RSS mesuré backend par backend)"""
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        results.put((name, asyncio.run(benchmark(name, users, downloads))))
+
+
+def report(name: str, result: Dict, downloads: int):
+    print(f"\n=== {name} ===")
+    print(
+        f"ingestion : {result['ingest_s']:.1f} s ({downloads / result['ingest_s']:.0f} téléchargements/s), "
+        f"flush max {result['max_flush_ms']:.1f} ms, pic RSS {result['peak_rss_mb']:.0f} Mo"
+    )
+    print(f"{'opération':<18}{'n':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for op, stats in result["ops"].items():
+        print(f"{op:<18}{stats['n']:>8}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}{stats['max']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--downloads", type=int, default=1_000_000)
+    parser.add_argument("--backends", nargs="+", default=["memory", "json", "sqlite"], choices=["memory", "json", "sqlite"])
+    args = parser.parse_args()
+
+    print(f"⏱️ {args.users} utilisateurs, {args.downloads} téléchargements par backend")
+    context = multiprocessing.get_context("spawn")
+    for name in args.backends:
+        results = context.Queue()
+        process = context.Process(target=_run_isolated, args=(name, args.users, args.downloads, results))
+        process.start()
+        _, result = results.get()
+        process.join()
+        report(name, result, args.downloads)
+
+
+if __name__ == "__main__":
+    main()
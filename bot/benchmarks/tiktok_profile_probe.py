@@ -0,0 +1,149 @@
+"""Chemin rapide (page de profil + JSON embarqué) contre yt-dlp, hors ligne
+
+Pour chaque fixture HTML de benchmarks/fixtures :
+- vérifie le résultat attendu du parseur natif (dernière vidéo, live, ou
+  repli sur yt-dlp) ;
+- mesure le parseur natif et, si yt-dlp est installé, la partie locale du
+  chemin yt-dlp sur la même page : création d'un YoutubeDL, passage par
+  un thread, analyse du JSON embarqué par l'extracteur TikTok.
+
+Le réseau est exclu des deux côtés : en production, le chemin yt-dlp fait
+en plus plusieurs requêtes d'API là où le chemin rapide n'en fait qu'une.
+
+Utilisation (depuis le dossier bot) :
+    python benchmarks/tiktok_profile_probe.py [--iterations 200]
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+# Ajouter le dossier parent au path pour importer utils
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.tiktok_profile import parse_profile_html, with_latest_entry  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Résultat attendu par fixture : (id de la dernière vidéo, live) ou None (repli yt-dlp)
+EXPECTED = {
+    "tiktok_profile_universal.html": ("7300000000000000031", False),
+    "tiktok_profile_sigi_live.html": ("7300000000000000020", True),
+    "tiktok_profile_no_items.html": None,
+}
+
+
+def check_fixture(name: str, html: str) -> bool:
+    info = parse_profile_html(html)
+    got = (info["entries"][0]["id"], info["is_live"]) if info else None
+    ok = got == EXPECTED[name]
+    print(f"{'✅' if ok else '❌'} {name} : {got if got else 'repli sur yt-dlp'}")
+    return ok
+
+
+def check_fallback_order() -> bool:
+    """Le repli yt-dlp (vidéo épinglée en tête, sans date) retient la même vidéo que le chemin rapide"""
+    # Identifiants TikTok : date de création dans les 32 bits de poids fort
+    pinned, newest, older = (str(created << 32) for created in (1700000000, 1760111600, 1760000000))
+    info = with_latest_entry({"entries": [{"id": pinned}, {"id": newest}, {"id": older}]})
+    ok = info["entries"][0]["id"] == newest
+    print(f"{'✅' if ok else '❌'} repli yt-dlp : vidéo épinglée ignorée")
+    return ok
+
+
+def summarize(samples: List[float]) -> str:
+    samples = sorted(samples)
+    pick = lambda q: samples[min(int(q * len(samples)), len(samples) - 1)] * 1000  # noqa: E731
+    return f"p50 {pick(0.5):.3f} ms, p95 {pick(0.95):.3f} ms"
+
+
+def peak_memory_kb(call: Callable[[], object]) -> float:
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def native_path(html: str):
+    return parse_profile_html(html)
+
+
+def ytdlp_path(html: str, username: str):
+    """Partie locale du chemin yt-dlp, telle qu'exécutée par fetch_tiktok_feed"""
+    import yt_dlp
+
+    opts = {"quiet": True, "no_warnings": True, "extract_flat": True, "playlist_items": "1"}
+    with yt_dlp.YoutubeDL(opts) as ydl:  # type: ignore
+        ie = ydl.get_info_extractor("TikTokUser")
+        for method in ("_get_universal_data", "_get_sigi_state"):
+            parse = getattr(ie, method, None)
+            if parse is None:
+                continue
+            try:
+                data = parse(html, username)
+            except Exception:
+                data = None
+            if data:
+                return data
+    return None
+
+
+async def measure_async(call: Callable[[], object], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await asyncio.to_thread(call)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def measure(call: Callable[[], object], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    has_ytdlp = importlib.util.find_spec("yt_dlp") is not None
+    if not has_ytdlp:
+        print("⚠️ yt-dlp non installé : seul le chemin rapide est mesuré")
+
+    ok = check_fallback_order()
+    results: Dict[str, Dict[str, str]] = {}
+    for name in sorted(EXPECTED):
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+            html = f.read()
+        ok = check_fixture(name, html) and ok
+        username = name.split(".")[0]  # Sert uniquement aux messages d'erreur de yt-dlp
+
+        results[name] = {
+            "natif": f"{summarize(measure(lambda: native_path(html), args.iterations))}, "
+                     f"pic mémoire {peak_memory_kb(lambda: native_path(html)):.0f} Ko",
+        }
+        if has_ytdlp:
+            samples = asyncio.run(measure_async(lambda: ytdlp_path(html, username), args.iterations))
+            results[name]["yt-dlp"] = (
+                f"{summarize(samples)}, pic mémoire {peak_memory_kb(lambda: ytdlp_path(html, username)):.0f} Ko"
+            )
+
+    print()
+    for name, paths in results.items():
+        print(f"=== {name} ===")
+        for path, line in paths.items():
+            print(f"  {path:<8}{line}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
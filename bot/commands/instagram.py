@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import yt_dlp
 import os
 import tempfile
 import logging
@@ -11,6 +10,12 @@ import sys
 # Ajouter le dossier parent au path pour importer utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.attachment_registry import attachment_registry
+from utils.download_executor import download_executor
+from utils.extraction_service import extraction_service
+from utils.format_selection import direct_url, select_format, smallest_size, upload_limit
+from utils.media_cache import media_cache, media_key
+from utils.progress import ProgressReporter
 from utils.stats_manager import stats_manager
 
 class Instagram(commands.Cog):
@@ -19,37 +24,6 @@ class Instagram(commands.Cog):
         # Limite le nombre de téléchargements simultanés à 2
         self.semaphore = asyncio.Semaphore(2)
 
-    def create_progress_hook(self, progress_msg, send_to_channel, user_mention):
-        """Crée un hook de progression unique pour chaque téléchargement"""
-        async def update_progress(content):
-            """Met à jour le message de progression"""
-            if progress_msg:
-                try:
-                    await progress_msg.edit(content=content)
-                except Exception:
-                    pass  # Ignore les erreurs de rate limit
-        
-        def progress_hook(d):
-            """Hook pour suivre la progression du téléchargement"""
-            if d['status'] == 'downloading':
-                try:
-                    # Extraire les informations de progression
-                    downloaded = d.get('downloaded_bytes', 0)
-                    total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-                    
-                    if total:
-                        percent = int(downloaded / total * 100)
-                        prefix = user_mention if send_to_channel else ""
-                        
-                        # Mettre à jour le message de progression de manière asynchrone
-                        asyncio.create_task(update_progress(
-                            f"{prefix}⏳ Téléchargement : {percent}%"
-                        ))
-                except Exception as e:
-                    logging.warning(f"⚠️ Erreur dans progress_hook: {e}")
-        
-        return progress_hook
-
     @app_commands.command(
         name="instagram",
         description="Télécharge une vidéo Instagram et l'envoie en message privé"
@@ -84,6 +58,7 @@ class Instagram(commands.Cog):
             progress_msg = None
             send_to_channel = False
             user_mention = ""
+            cached_file = None  # Fichier du cache réservé pendant l'envoi
             
             try:
                 # Vérifier que c'est bien un lien Instagram
@@ -125,8 +100,8 @@ class Instagram(commands.Cog):
                     send_to_channel = True
                     user_mention = f"{interaction.user.mention} "
                 
-                # Créer un progress_hook unique pour ce téléchargement
-                progress_hook = self.create_progress_hook(progress_msg, send_to_channel, user_mention)
+                # Suivi de progression propre à ce téléchargement (modifications limitées)
+                progress = ProgressReporter(progress_msg, prefix=user_mention)
                 
                 ydl_opts = {
                     'format': 'best',
@@ -134,18 +109,89 @@ class Instagram(commands.Cog):
                     'quiet': True,
                     'no_warnings': True,
                     'extract_flat': False,
-                    'progress_hooks': [progress_hook],
+                    'progress_hooks': [progress.ytdlp_hook],
                 }
 
-                # Télécharger la vidéo
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:  # type: ignore
-                    info = ydl.extract_info(url, download=True)
-                    video_title = info.get('title') or 'Instagram Video'
-                    video_file = ydl.prepare_filename(info)
+                cache_key = media_key("instagram", url)
+
+                # Vidéo déjà envoyée : lien vers la pièce jointe Discord existante, sans nouvel envoi
+                reused = await attachment_registry.reply_with_attachment(
+                    self.bot, cache_key, interaction, send_to_channel
+                ) if cache_key else None
+                if reused:
+                    await progress.finish()
+                    if progress_msg:
+                        await progress_msg.delete()
+                    try:
+                        await stats_manager.record_download(
+                            user_id=interaction.user.id,
+                            user_name=interaction.user.name,
+                            platform="instagram",
+                            video_url=url,
+                            video_title=reused["title"]
+                        )
+                    except Exception as stats_error:
+                        logging.warning(f"⚠️ Erreur lors de l'enregistrement des stats: {stats_error}")
+                    logging.info(f"♻️ Pièce jointe Instagram réutilisée pour {interaction.user}")
+                    return
+
+                # Média déjà en cache : ni extraction ni téléchargement
+                max_size = upload_limit(interaction.guild, in_dm=not send_to_channel)
+                cached = media_cache.get(cache_key) if cache_key else None
+                if cached and cached["size"] > max_size:
+                    media_cache.release(cached["path"])
+                    cached = None  # Trop lourde pour cette destination : un format plus léger sera choisi
+                in_cache = cached is not None
+
+                if cached:
+                    await progress.finish()
+                    video_title = cached["title"]
+                    video_file = cached_file = cached["path"]
+                    file_size = cached["size"]
+                else:
+                    # Extraction des métadonnées dans le pool de processus
+                    info = await extraction_service.extract(url, {
+                        'format': 'best',
+                        'quiet': True,
+                        'no_warnings': True,
+                    })
+                    if not info:
+                        raise Exception("Aucune vidéo trouvée à ce lien")
+
+                    # Choix du format avant téléchargement : il doit tenir dans la limite d'envoi
+                    fmt = select_format(info, max_size)
+                    if fmt is None:
+                        # Aucun format ne tient : lien direct, sans rien télécharger
+                        await progress.finish()
+                        size_mb = (smallest_size(info) or 0) / (1024 * 1024)
+                        message = (
+                            f"📎 La vidéo est trop lourde pour Discord ({size_mb:.2f} MB).\n"
+                            f"Voici le lien direct : {direct_url(info) or url}"
+                        )
+                        if send_to_channel:
+                            await interaction.followup.send(f"{interaction.user.mention} {message}")
+                            if progress_msg:
+                                await progress_msg.delete()
+                            logging.info("📎 Lien direct Instagram envoyé sur le salon")
+                        else:
+                            await interaction.user.send(message)
+                            if progress_msg:
+                                await progress_msg.edit(content="✅ Lien direct envoyé en message privé")
+                            logging.info("📎 Lien direct Instagram envoyé en DM")
+                        return
+                    if fmt.get('format_id'):
+                        ydl_opts['format'] = fmt['format_id']
+
+                    # Télécharger la vidéo dans le pool de téléchargement (hors de la boucle)
+                    try:
+                        result = await download_executor.download(info, ydl_opts)
+                    finally:
+                        await progress.finish()
+                    video_title = result.info.get('title') or 'Instagram Video'
+                    video_file = result.filepath
 
-                # Vérifier la taille du fichier
-                file_size = os.path.getsize(video_file)
-                max_size = 8 * 1024 * 1024  # 8 MB en octets
+                    # Vérifier la taille du fichier (taille du format inconnue avant téléchargement)
+                    file_size = result.filesize
                 
                 if file_size > max_size:
                     size_mb = file_size / (1024 * 1024)
@@ -154,36 +200,45 @@ class Instagram(commands.Cog):
                     if send_to_channel:
                         await interaction.followup.send(
                             f"{interaction.user.mention} ❌ La vidéo est trop volumineuse ({size_mb:.2f} MB). "
-                            f"La limite est de 8 MB."
+                            f"La limite est de {max_size / (1024 * 1024):.0f} MB."
                         )
                         if progress_msg:
                             await progress_msg.delete()
                     else:
                         await interaction.user.send(
                             f"❌ La vidéo est trop volumineuse ({size_mb:.2f} MB). "
-                            f"La limite est de 8 MB."
+                            f"La limite est de {max_size / (1024 * 1024):.0f} MB."
                         )
                         if progress_msg:
                             await progress_msg.edit(content="❌ Vidéo trop volumineuse.")
                     return
 
+                # Garder la vidéo pour les prochaines demandes du même lien
+                if not in_cache and cache_key:
+                    cached_path = await asyncio.to_thread(media_cache.put, cache_key, video_file, video_title)
+                    if cached_path:
+                        video_file = cached_file = cached_path
+                        in_cache = True
+
                 # Envoyer la vidéo
                 video_sent_successfully = False
+                sent_msg = None
                 try:
                     with open(video_file, 'rb') as f:
                         discord_file = discord.File(f, filename=f"{video_title[:50]}.mp4")
                         
                         if send_to_channel:
-                            await interaction.followup.send(
+                            sent_msg = await interaction.followup.send(
                                 content=f"{interaction.user.mention} ✅ Téléchargement terminé :",
-                                file=discord_file
+                                file=discord_file,
+                                wait=True,
                             )
                             if progress_msg:
                                 await progress_msg.delete()
                             logging.info("✅ Vidéo Instagram envoyée sur le salon")
                             video_sent_successfully = True
                         else:
-                            await interaction.user.send(
+                            sent_msg = await interaction.user.send(
                                 content="✅ Téléchargement terminé :",
                                 file=discord_file
                             )
@@ -199,7 +254,7 @@ class Instagram(commands.Cog):
                             
                             if send_to_channel:
                                 # Si échec sur le salon, essaie en DM
-                                await interaction.user.send(
+                                sent_msg = await interaction.user.send(
                                     content="✅ Téléchargement terminé :",
                                     file=discord_file
                                 )
@@ -209,9 +264,10 @@ class Instagram(commands.Cog):
                                 video_sent_successfully = True
                             else:
                                 # Si échec en DM, essaie sur le salon
-                                await interaction.followup.send(
+                                sent_msg = await interaction.followup.send(
                                     content=f"{interaction.user.mention} ✅ Téléchargement terminé :",
-                                    file=discord_file
+                                    file=discord_file,
+                                    wait=True,
                                 )
                                 if progress_msg:
                                     await progress_msg.edit(
@@ -237,9 +293,12 @@ class Instagram(commands.Cog):
                         )
                     except Exception as stats_error:
                         logging.warning(f"⚠️ Erreur lors de l'enregistrement des stats: {stats_error}")
+                    # Les prochaines demandes du même lien réutiliseront cette pièce jointe
+                    if cache_key:
+                        await attachment_registry.record(cache_key, sent_msg, video_title)
 
-                # Nettoyer le fichier temporaire
-                if os.path.exists(video_file):
+                # Nettoyer le fichier temporaire (les vidéos en cache sont conservées)
+                if not in_cache and os.path.exists(video_file):
                     os.remove(video_file)
                 logging.info(f"✅ Vidéo Instagram téléchargée et envoyée par {interaction.user}")
 
@@ -255,6 +314,9 @@ class Instagram(commands.Cog):
                         f"❌ Une erreur s'est produite : {str(download_error)}",
                         ephemeral=True
                     )
+            finally:
+                if cached_file:
+                    media_cache.release(cached_file)
 
 async def setup(bot):
     await bot.add_cog(Instagram(bot))
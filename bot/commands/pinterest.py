@@ -11,6 +11,9 @@ import sys
 # Ajouter le dossier parent au path pour importer utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.attachment_registry import attachment_registry
+from utils.media_cache import media_cache, media_key
+from utils.progress import ProgressReporter
 from utils.stats_manager import stats_manager
 
 
@@ -114,6 +117,7 @@ class Pinterest(commands.Cog):
                         await interaction.followup.send(f"{interaction.user.mention} ❌ Lien Pinterest invalide.")
                     return
 
+                cached_file = None  # Fichier du cache réservé pendant l'envoi
                 try:
                     # Récupère le contenu de la page Pinterest
                     async with session.get(url) as resp:
@@ -204,37 +208,62 @@ class Pinterest(commands.Cog):
                             f"{interaction.user.mention} ⏳ Téléchargement de la vidéo en cours : 0%", wait=True
                         )
                         send_to_channel = True  # On enverra la vidéo sur le salon
-                    async with session.get(video_url) as video_resp:
-                        file_size = int(video_resp.headers.get("Content-Length", 0))
-                        chunk_size = 1024 * 64  # Taille des chunks (64 Ko)
-                        downloaded = 0
-                        video_data = bytearray()
+                    progress = ProgressReporter(
+                        progress_msg, prefix=f"{interaction.user.mention} " if send_to_channel else ""
+                    )
 
-                        # Télécharge la vidéo par morceaux
-                        while True:
-                            chunk = await video_resp.content.read(chunk_size)
-                            if not chunk:
-                                break
-                            video_data.extend(chunk)
-                            downloaded += len(chunk)
+                    cache_key = media_key("pinterest", url)
 
-                            # Met à jour la progression en pourcentage ou en Mo
-                            if file_size:
-                                percent = int(downloaded / file_size * 100)
-                                prefix = f"{interaction.user.mention} " if send_to_channel else ""
-                                await progress_msg.edit(
-                                    content=f"{prefix}⏳ Téléchargement : {percent}%"
-                                )
-                            else:
-                                size_mb = round(downloaded / 1024 / 1024, 2)
-                                prefix = f"{interaction.user.mention} " if send_to_channel else ""
-                                await progress_msg.edit(
-                                    content=f"{prefix}⏳ Téléchargement : {size_mb} Mo"
-                                )
+                    # Vidéo déjà envoyée : lien vers la pièce jointe Discord existante, sans nouvel envoi
+                    reused = await attachment_registry.reply_with_attachment(
+                        self.bot, cache_key, interaction, send_to_channel
+                    ) if cache_key else None
+                    if reused:
+                        await progress.finish()
+                        await progress_msg.delete()
+                        try:
+                            await stats_manager.record_download(
+                                user_id=interaction.user.id,
+                                user_name=interaction.user.name,
+                                platform="pinterest",
+                                video_url=url,
+                                video_title="Pinterest Video"
+                            )
+                        except Exception as stats_error:
+                            logging.warning(f"⚠️ Erreur lors de l'enregistrement des stats: {stats_error}")
+                        logging.info(f"♻️ Pièce jointe Pinterest réutilisée pour {interaction.user}")
+                        return
+
+                    # Média déjà en cache : pas de nouveau téléchargement
+                    cached = media_cache.get(cache_key) if cache_key else None
+                    in_cache = cached is not None
+                    if cached:
+                        cached_file = cached["path"]  # Réservé dès la lecture : libéré même si la vidéo est trop lourde
+                        await progress.finish()
+                        video_size = cached["size"]
+                    else:
+                        async with session.get(video_url) as video_resp:
+                            file_size = int(video_resp.headers.get("Content-Length", 0))
+                            chunk_size = 1024 * 64  # Taille des chunks (64 Ko)
+                            downloaded = 0
+                            video_data = bytearray()
+
+                            # Télécharge la vidéo par morceaux
+                            while True:
+                                chunk = await video_resp.content.read(chunk_size)
+                                if not chunk:
+                                    break
+                                video_data.extend(chunk)
+                                downloaded += len(chunk)
+
+                                # Progression en pourcentage ou en Mo (modifications regroupées)
+                                progress.update(downloaded, file_size)
+                        await progress.finish()
+                        video_size = len(video_data)
 
                     # Vérifie si la vidéo dépasse la limite de taille de Discord
-                    if len(video_data) > self.max_file_size_mb * 1024 * 1024:
-                        size_mb = round(len(video_data) / 1024 / 1024, 2)
+                    if video_size > self.max_file_size_mb * 1024 * 1024:
+                        size_mb = round(video_size / 1024 / 1024, 2)
                         # Envoie le lien direct selon l'endroit déterminé
                         if send_to_channel:
                             await interaction.followup.send(
@@ -253,76 +282,95 @@ class Pinterest(commands.Cog):
 
                         return
 
-                    # Sauvegarde temporairement la vidéo sur le disque
-                    with open("temp.mp4", "wb") as f:
-                        f.write(video_data)
+                    # Garde la vidéo en cache pour les prochaines demandes (sinon fichier temporaire)
+                    if cached:
+                        video_path = cached_file
+                    else:
+                        video_path = None
+                        if cache_key:
+                            video_path = await asyncio.to_thread(
+                                media_cache.put_bytes, cache_key, video_data, "Pinterest Video"
+                            )
+                        in_cache = video_path is not None
+                        cached_file = video_path
+                        if not in_cache:
+                            video_path = "temp.mp4"
+                            with open(video_path, "wb") as f:
+                                f.write(video_data)
 
-                        video_sent_successfully = False
+                    video_sent_successfully = False
+                    sent_msg = None
+                    try:
+                        # Envoie la vidéo selon l'endroit déterminé
+                        if send_to_channel:
+                            sent_msg = await interaction.followup.send(
+                                content=f"{interaction.user.mention} ✅ Téléchargement terminé :",
+                                file=discord.File(video_path),
+                                wait=True,
+                            )
+                            await progress_msg.delete()
+                            logging.info("✅ Vidéo envoyée sur le salon")
+                            video_sent_successfully = True
+                        else:
+                            sent_msg = await interaction.user.send(
+                                content="✅ Téléchargement terminé :",
+                                file=discord.File(video_path),
+                            )
+                            
+                            logging.info("✅ Vidéo envoyée en DM avec succès")
+                            video_sent_successfully = True
+
+                    except Exception as e:
+                        # Si l'envoi échoue, essaie l'autre méthode
+                        logging.warning(f"⚠️ Échec de l'envoi : {e}. Tentative alternative...")
                         try:
-                            # Envoie la vidéo selon l'endroit déterminé
                             if send_to_channel:
-                                await interaction.followup.send(
-                                    content=f"{interaction.user.mention} ✅ Téléchargement terminé :",
-                                    file=discord.File("temp.mp4"),
+                                # Si échec sur le salon, essaie en DM
+                                sent_msg = await interaction.user.send(
+                                    content="✅ Téléchargement terminé :",
+                                    file=discord.File(video_path),
                                 )
                                 await progress_msg.delete()
-                                logging.info("✅ Vidéo envoyée sur le salon")
+                                logging.info("✅ Vidéo envoyée en DM")
                                 video_sent_successfully = True
                             else:
-                                await interaction.user.send(
-                                    content="✅ Téléchargement terminé :",
-                                    file=discord.File("temp.mp4"),
+                                # Si échec en DM, essaie sur le salon
+                                sent_msg = await interaction.followup.send(
+                                    content=f"{interaction.user.mention} ✅ Téléchargement terminé :",
+                                    file=discord.File(video_path),
+                                    wait=True,
                                 )
-                                
-                                logging.info("✅ Vidéo envoyée en DM avec succès")
-                                video_sent_successfully = True
-
-                        except Exception as e:
-                            # Si l'envoi échoue, essaie l'autre méthode
-                            logging.warning(f"⚠️ Échec de l'envoi : {e}. Tentative alternative...")
-                            try:
-                                if send_to_channel:
-                                    # Si échec sur le salon, essaie en DM
-                                    await interaction.user.send(
-                                        content="✅ Téléchargement terminé :",
-                                        file=discord.File("temp.mp4"),
-                                    )
-                                    await progress_msg.delete()
-                                    logging.info("✅ Vidéo envoyée en DM")
-                                    video_sent_successfully = True
-                                else:
-                                    # Si échec en DM, essaie sur le salon
-                                    await interaction.followup.send(
-                                        content=f"{interaction.user.mention} ✅ Téléchargement terminé :",
-                                        file=discord.File("temp.mp4"),
-                                    )
-                                    await progress_msg.edit(
-                                        content="✅ Vidéo envoyée sur le salon (DM bloqués)"
-                                    )
-                                    logging.info("✅ Vidéo envoyée sur le salon")
-                                    video_sent_successfully = True
-                            except Exception as e2:
-                                prefix = f"{interaction.user.mention} " if send_to_channel else ""
                                 await progress_msg.edit(
-                                    content=f"{prefix}❌ Impossible d'envoyer la vidéo : {e2}"
+                                    content="✅ Vidéo envoyée sur le salon (DM bloqués)"
                                 )
-                                logging.error(f"❌ Échec complet de l'envoi : {e2}")
+                                logging.info("✅ Vidéo envoyée sur le salon")
+                                video_sent_successfully = True
+                        except Exception as e2:
+                            prefix = f"{interaction.user.mention} " if send_to_channel else ""
+                            await progress_msg.edit(
+                                content=f"{prefix}❌ Impossible d'envoyer la vidéo : {e2}"
+                            )
+                            logging.error(f"❌ Échec complet de l'envoi : {e2}")
 
-                        # Enregistrer les statistiques si l'envoi a réussi
-                        if video_sent_successfully:
-                            try:
-                                await stats_manager.record_download(
-                                    user_id=interaction.user.id,
-                                    user_name=interaction.user.name,
-                                    platform="pinterest",
-                                    video_url=url,
-                                    video_title="Pinterest Video"
-                                )
-                            except Exception as stats_error:
-                                logging.warning(f"⚠️ Erreur lors de l'enregistrement des stats: {stats_error}")
+                    # Enregistrer les statistiques si l'envoi a réussi
+                    if video_sent_successfully:
+                        try:
+                            await stats_manager.record_download(
+                                user_id=interaction.user.id,
+                                user_name=interaction.user.name,
+                                platform="pinterest",
+                                video_url=url,
+                                video_title="Pinterest Video"
+                            )
+                        except Exception as stats_error:
+                            logging.warning(f"⚠️ Erreur lors de l'enregistrement des stats: {stats_error}")
+                        # Les prochaines demandes du même lien réutiliseront cette pièce jointe
+                        if cache_key:
+                            await attachment_registry.record(cache_key, sent_msg, "Pinterest Video")
 
-                    # Supprime le fichier temporaire après l'envoi
-                    os.remove("temp.mp4")
+                    # Supprime le fichier temporaire après l'envoi (les vidéos en cache sont conservées)
+                    if not in_cache:
+                        os.remove(video_path)
 
                 except Exception as e:
                     # Gère les erreurs et notifie l'utilisateur en DM
@@ -337,6 +385,9 @@ class Pinterest(commands.Cog):
                             f"❌ Une erreur est survenue : {str(e)}",
                             ephemeral=True
                         )
+                finally:
+                    if cached_file:
+                        media_cache.release(cached_file)
 
 
 # Fonction pour charger le "Cog" dans le bot
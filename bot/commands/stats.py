@@ -70,8 +70,9 @@ class Stats(commands.Cog):
     async def _show_personal_stats(self, interaction: discord.Interaction, target_user: Optional[discord.Member] = None, ephemeral: bool = False):
         """Affiche les statistiques personnelles"""
         target = target_user if target_user else interaction.user
-        user_stats = await stats_manager.get_user_stats(target.id)
-        user_rank = await stats_manager.get_user_rank(target.id)
+        snapshot = await stats_manager.snapshot()
+        user_stats = await snapshot.get_user_stats(target.id)
+        user_rank = await snapshot.get_user_rank(target.id)
         
         embed = discord.Embed(
             title=f"📊 Statistiques de {target.display_name}",
@@ -151,7 +152,8 @@ class Stats(commands.Cog):
     
     async def _show_leaderboard(self, interaction: discord.Interaction):
         """Affiche le classement général"""
-        top_users = await stats_manager.get_top_users(limit=10)
+        snapshot = await stats_manager.snapshot()
+        top_users = await snapshot.get_top_users(limit=10)
         
         embed = discord.Embed(
             title="🏆 Classement Général - Top 10",
@@ -189,9 +191,9 @@ class Stats(commands.Cog):
             )
         
         # Ajouter la position de l'utilisateur actuel s'il n'est pas dans le top 10
-        user_rank = await stats_manager.get_user_rank(interaction.user.id)
+        user_rank = await snapshot.get_user_rank(interaction.user.id)
         if user_rank > 10:
-            user_stats = await stats_manager.get_user_stats(interaction.user.id)
+            user_stats = await snapshot.get_user_stats(interaction.user.id)
             embed.add_field(
                 name="📍 Votre position",
                 value=f"#{user_rank} avec **{user_stats['downloads']}** téléchargements",
@@ -204,7 +206,7 @@ class Stats(commands.Cog):
     
     async def _show_top_videos(self, interaction: discord.Interaction):
         """Affiche les vidéos les plus téléchargées"""
-        top_videos = await stats_manager.get_top_videos(limit=10)
+        top_videos = await (await stats_manager.snapshot()).get_top_videos(limit=10)
         
         embed = discord.Embed(
             title="🎬 Vidéos les Plus Téléchargées",
@@ -226,7 +228,7 @@ class Stats(commands.Cog):
                 
                 platform_emoji = "📹" if video_data['platform'] == "instagram" else "📌"
                 downloads = video_data['downloads']
-                unique_users = len(video_data.get('downloaded_by', []))
+                unique_users = video_data.get('unique_users', 0)
                 
                 embed.add_field(
                     name=f"{rank}. {platform_emoji} {title}",
@@ -240,7 +242,8 @@ class Stats(commands.Cog):
     
     async def _show_global_stats(self, interaction: discord.Interaction):
         """Affiche les statistiques globales du bot"""
-        global_stats = await stats_manager.get_global_stats()
+        snapshot = await stats_manager.snapshot()
+        global_stats = await snapshot.get_global_stats()
         
         embed = discord.Embed(
             title="🌐 Statistiques Globales",
@@ -302,6 +305,14 @@ class Stats(commands.Cog):
                 value=f"{avg_per_user:.1f} téléchargements",
                 inline=True
             )
+
+        # Activité récente (compteurs par jour)
+        embed.add_field(
+            name="📅 7 derniers jours",
+            value=f"{await snapshot.get_window_total(granularity='day', count=7)} téléchargements\n"
+                  f"dont {await snapshot.get_window_total(granularity='hour', count=24)} ces dernières 24h",
+            inline=True
+        )
         
         embed.set_footer(text="TikTokNation Bot • Merci de faire partie de la communauté ! 💜")
         
@@ -23,15 +23,16 @@ class Suggest(commands.Cog):
         await interaction.response.defer(ephemeral=True)
         
         try:
-            # Récupérer les vidéos les plus téléchargées
-            top_videos = await stats_manager.get_top_videos(limit=5)
-            global_stats = await stats_manager.get_global_stats()
+            # Récupérer les vidéos tendance (un seul snapshot, top-K déjà trié)
+            snapshot = await stats_manager.snapshot()
+            top_videos = await snapshot.get_trending_videos(limit=5)
+            global_stats = await snapshot.get_global_stats()
             
             # Créer l'embed
             embed = discord.Embed(
                 title="💡 Contenu Tendance",
                 description="*Voici les contenus les plus populaires du serveur !*\n"
-                           "Ces vidéos ont été les plus téléchargées par la communauté.\n\n"
+                           "Ces vidéos sont les plus téléchargées par la communauté en ce moment.\n\n"
                            "═══════════════════════════════════════",
                 color=discord.Color.from_rgb(255, 105, 180)  # Rose tendance
             )
@@ -54,12 +55,12 @@ class Suggest(commands.Cog):
                     "youtube": "▶️"
                 }
                 
-                for rank, (video_url, video_data) in enumerate(top_videos, start=1):
+                for rank, (video_url, video_data, _score) in enumerate(top_videos, start=1):
                     platform = video_data.get('platform', 'inconnu')
                     platform_emoji = emoji_platforms.get(platform, "🎬")
                     title = video_data.get('title', 'Vidéo sans titre')
                     downloads = video_data.get('downloads', 0)
-                    unique_users = len(video_data.get('downloaded_by', []))
+                    unique_users = video_data.get('unique_users', 0)
                     
                     # Tronquer le titre s'il est trop long
                     if len(title) > 50:
@@ -72,7 +73,7 @@ class Suggest(commands.Cog):
                     )
                 
                 embed.add_field(
-                    name="🔥 Top 5 des contenus populaires",
+                    name="🔥 Top 5 des contenus tendance",
                     value=suggestions_text,
                     inline=False
                 )
@@ -1,27 +1,58 @@
+import aiohttp
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
 import logging
 import sys
 import os
-import yt_dlp
 import asyncio
 import random
+import time
 from datetime import datetime
 
 # Ajouter le dossier parent au path pour importer utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.extraction_service import extraction_service
+from utils.feed_digest import feed_digest, feed_digests
+from utils.poll_scheduler import (
+    PollScheduler,
+    breaker_status,
+    compute_interval,
+    compute_live_interval,
+    is_unhealthy,
+    jittered,
+    live_changed,
+    observe_feed,
+    observe_live,
+    record_failure,
+    record_success,
+)
+from utils.rate_limiter import tiktok_rate_limiter
+from utils.tiktok_live import probe_live
+from utils.tiktok_profile import FALLBACK_ITEMS, fetch_profile, with_latest_entry
 from utils.tiktok_tracker import tiktok_tracker
 
 
 class TikTokAuto(commands.Cog):
     TIKTOK_CHANNEL_NAME = "🔥┃tiktok-posts"
+    # Deux niveaux de surveillance : sonde de live légère et fréquente, flux vidéo (yt-dlp) plus espacé
+    TIERS = ("live", "feed")
 
     def __init__(self, bot):
         self.bot = bot
-        self.check_interval = 300  # 5 minutes
-        self.checking = False
+        self.report_interval = 300  # Bilan de la surveillance toutes les 5 minutes
+        self.sync_interval = 30  # Prise en compte des comptes liés/déliés
+        # Nombre d'extractions yt-dlp simultanées ; le débit global est borné par tiktok_rate_limiter
+        self.max_concurrency = int(os.getenv("TIKTOK_POLL_CONCURRENCY", 4))
+        self.extraction_slots = asyncio.Semaphore(self.max_concurrency)
+        self.schedulers = {tier: PollScheduler() for tier in self.TIERS}
+        self.in_flight: dict[str, set[str]] = {tier: set() for tier in self.TIERS}
+        self.http: aiohttp.ClientSession | None = None
+        self.poll_task: asyncio.Task | None = None
+        self._check_tasks: set[asyncio.Task] = set()
+        self.poll_stats = self._empty_poll_stats()
+        self.last_report: dict | None = None
 
     def get_tiktok_channel(self, guild: discord.Guild) -> discord.TextChannel | None:
         """Trouve le canal TikTok par son nom"""
@@ -32,12 +63,19 @@ class TikTokAuto(commands.Cog):
 
     async def cog_load(self):
         """Démarrage de la tâche de vérification"""
-        self.check_new_videos.start()
+        self.http = aiohttp.ClientSession()
+        self.poll_task = asyncio.create_task(self.poll_loop())
         logging.info("✅ Système de surveillance TikTok démarré")
 
     async def cog_unload(self):
         """Arrêt de la tâche de vérification"""
-        self.check_new_videos.cancel()
+        if self.poll_task:
+            self.poll_task.cancel()
+        for task in self._check_tasks:
+            task.cancel()
+        if self.http:
+            await self.http.close()
+        await tiktok_tracker.flush()
         logging.info("🔴 Système de surveillance TikTok arrêté")
 
     @app_commands.command(
@@ -103,6 +141,8 @@ class TikTokAuto(commands.Cog):
         was_new = tiktok_tracker.link_account(
             interaction.guild_id, interaction.user.id, username
         )
+        # Le prochain flux doit être distribué pour enregistrer l'état du nouvel abonné
+        feed_digests.forget(username)
 
         if was_new:
             embed = discord.Embed(
@@ -118,7 +158,7 @@ class TikTokAuto(commands.Cog):
                 color=discord.Color.green(),
             )
 
-        embed.set_footer(text="Vérifications toutes les 5 minutes (vidéos + lives)")
+        embed.set_footer(text="Vérifications automatiques (vidéos + lives), plus fréquentes pour les comptes actifs")
         await interaction.followup.send(embed=embed, ephemeral=True)
         logging.info(f"🔗 {interaction.user} a lié son compte TikTok: @{username}")
 
@@ -231,15 +271,19 @@ class TikTokAuto(commands.Cog):
         for user_id, user_data in linked_users.items():
             user = interaction.guild.get_member(int(user_id))
             username = user_data["tiktok_username"]
+            # Disjoncteur ouvert : compte banni, renommé ou privé
+            health = (
+                "\n⚠️ Injoignable" if is_unhealthy(tiktok_tracker.get_account_state(username)) else ""
+            )
 
             if user:
                 embed.add_field(
-                    name=f"@{username}", value=f"👤 {user.mention}", inline=True
+                    name=f"@{username}", value=f"👤 {user.mention}{health}", inline=True
                 )
             else:
                 embed.add_field(
                     name=f"@{username}",
-                    value=f"👤 Utilisateur quitté (ID: {user_id})",
+                    value=f"👤 Utilisateur quitté (ID: {user_id}){health}",
                     inline=True,
                 )
 
@@ -261,122 +305,336 @@ class TikTokAuto(commands.Cog):
         }
 
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:  # type: ignore
-                info = await asyncio.to_thread(ydl.extract_info, url, download=False)
-                return info is not None
+            await tiktok_rate_limiter.acquire()
+            info = await extraction_service.extract(url, ydl_opts)
+            return info is not None
         except Exception:
             return False
 
-    @tasks.loop(seconds=300)  # Toutes les 5 minutes
-    async def check_new_videos(self):
-        """Vérifie les nouvelles vidéos et lives des comptes liés"""
-        if self.checking:
-            return
+    @classmethod
+    def _empty_poll_stats(cls) -> dict:
+        stats = {tier: {"checks": 0, "errors": 0, "max_lag_s": 0.0} for tier in cls.TIERS}
+        stats["escalations"] = 0
+        stats["started"] = time.monotonic()
+        return stats
+
+    async def poll_loop(self):
+        """Planificateur : chaque compte est vérifié à ses propres échéances (live et flux)"""
+        await self.bot.wait_until_ready()
 
-        self.checking = True
+        while True:
+            try:
+                self.sync_schedule()
+                for tier, scheduler in self.schedulers.items():
+                    for username, due in scheduler.pop_due():
+                        self.in_flight[tier].add(username)
+                        task = asyncio.create_task(self.run_check(tier, username, due))
+                        self._check_tasks.add(task)
+                        task.add_done_callback(self._check_tasks.discard)
+                self.report_if_due()
+                await tiktok_tracker.flush_if_due()
+            except Exception as e:
+                logging.error(f"❌ Erreur dans le planificateur TikTok: {e}")
+
+            next_due = min(
+                (due for due in (s.next_due() for s in self.schedulers.values()) if due is not None),
+                default=None,
+            )
+            delay = self.sync_interval if next_due is None else next_due - time.time()
+            await asyncio.sleep(min(max(delay, 0.5), self.sync_interval))
+
+    def sync_schedule(self):
+        """Planifie les comptes nouvellement liés et oublie ceux qui ne sont plus suivis"""
+        tracked = set(tiktok_tracker.get_tracked_usernames())
+        for username in tracked:
+            state = None
+            for tier, scheduler in self.schedulers.items():
+                if username in scheduler or username in self.in_flight[tier]:
+                    continue
+                if state is None:
+                    state = tiktok_tracker.get_account_state(username)
+                if tier == "feed":
+                    scheduler.first_check(username, compute_interval(state), state.get("next_check"))
+                elif is_unhealthy(state):
+                    scheduler.first_check(username, self.live_interval(state), state.get("next_check"))
+                else:
+                    scheduler.first_check(username, self.live_interval(state))
+        for scheduler in self.schedulers.values():
+            for username in scheduler.usernames():
+                if username not in tracked:
+                    scheduler.remove(username)
+
+    def live_interval(self, state: dict, now: float | None = None) -> float:
+        """Intervalle de sonde de live, borné par la part du débit TikTok réservée aux sondes"""
+        accounts = max(len(self.schedulers["live"]) + len(self.in_flight["live"]), 1)
+        return compute_live_interval(state, now, accounts, tiktok_rate_limiter.rate)
+
+    async def run_check(self, tier: str, username: str, due: float):
+        """Exécute une vérification (sonde de live ou flux) puis replanifie le compte
+
+        L'état du compte n'est réécrit que s'il a changé au-delà de sa
+        prochaine échéance : un flux inchangé ne replanifie qu'en mémoire.
+        """
+        lag = time.time() - due
+        info = probe = None
+        fresh = False
         try:
-            accounts = tiktok_tracker.get_all_tracked_accounts()
+            if tier == "feed":
+                info, fresh = await self.check_username(username)
+            else:
+                probe = await self.check_live(username)
+        except Exception as e:
+            logging.error(f"❌ Erreur lors de la vérification ({tier}) de @{username}: {e}")
+        finally:
+            self.in_flight[tier].discard(username)
+
+        stats = self.poll_stats[tier]
+        stats["checks"] += 1
+        stats["max_lag_s"] = max(stats["max_lag_s"], lag)
+        if info is None and probe is None:
+            stats["errors"] += 1
+
+        # État relu après l'attente : l'autre niveau a pu le modifier entre-temps
+        state = observed = tiktok_tracker.get_account_state(username)
+        now = time.time()
+        if tier == "feed":
+            if info is not None:
+                if is_unhealthy(state):
+                    logging.info(f"✅ @{username} de nouveau joignable, reprise de la surveillance")
+                state = record_success(state)
+                if fresh:
+                    # Seul un flux nouveau apporte une vidéo ou un live à enregistrer
+                    state = observe_feed(state, info, now)
+                    if info.get("is_live"):
+                        # Live déjà notifié par le flux : la prochaine sonde n'y verra pas de changement
+                        state = observe_live(state, True, info.get("id"), now)
+            else:
+                state = record_failure(state, now)
+            changed = state != observed
+            interval = compute_interval(state, now)
+            state["interval"] = round(interval)
+            state["next_check"] = now + jittered(interval)
+            if breaker_status(state, now) == "open":
+                # Disjoncteur ouvert : une seule tentative (demi-ouverte) à retry_at
+                state["next_check"] = state["retry_at"]
+                logging.warning(
+                    f"🔌 @{username} injoignable ({state['failures']} échec(s) consécutif(s)), "
+                    f"prochaine tentative dans {(state['retry_at'] - now) / 60:.0f} min"
+                )
+            when = state["next_check"]
+        else:
+            if probe is not None:
+                state = observe_live(state, probe["is_live"], probe["room_id"], now)
+            changed = state != observed
+            when = now + jittered(self.live_interval(state, now))
+            if is_unhealthy(state):
+                # Compte injoignable : la sonde de live attend la prochaine tentative du flux
+                when = max(when, state.get("next_check", when))
+        if changed:
+            tiktok_tracker.update_account_state(username, state)
+        if tiktok_tracker.is_tracked(username):
+            self.schedulers[tier].schedule(username, when)
+
+    def report_if_due(self):
+        """Bilan périodique : volume de vérifications et retard maximal sur les échéances"""
+        stats = self.poll_stats
+        elapsed = time.monotonic() - stats["started"]
+        if elapsed < self.report_interval:
+            return
+        self.last_report = {
+            "accounts": len(tiktok_tracker.get_tracked_usernames()),
+            "window_s": round(elapsed),
+            "escalations": stats["escalations"],
+            "finished_at": datetime.now().isoformat(),
+        }
+        for tier in self.TIERS:
+            self.last_report[tier] = {
+                "checks": stats[tier]["checks"],
+                "errors": stats[tier]["errors"],
+                "max_lag_s": round(stats[tier]["max_lag_s"], 1),
+            }
+        live, feed = self.last_report["live"], self.last_report["feed"]
+        logging.info(
+            f"✅ Surveillance TikTok ({self.last_report['accounts']} compte(s), {elapsed:.0f}s) : "
+            f"{live['checks']} sonde(s) live, {feed['checks']} lecture(s) de flux, "
+            f"{stats['escalations']} changement(s) de live, retard max {max(live['max_lag_s'], feed['max_lag_s']):.1f}s "
+            f"({live['errors'] + feed['errors']} erreur(s))"
+        )
+        self.poll_stats = self._empty_poll_stats()
 
-            if not accounts:
-                return
+    async def fetch_tiktok_feed(self, username: str) -> dict | None:
+        """Récupère le flux d'un compte TikTok (dernière vidéo ou live en cours)
 
-            logging.info(f"🔍 Vérification de {len(accounts)} compte(s) TikTok...")
+        Chemin rapide : une requête HTTP sur la page de profil et lecture du
+        JSON embarqué. yt-dlp n'est utilisé que si la page n'a pas pu être
+        analysée.
+        """
+        if self.http is not None:
+            info = await fetch_profile(self.http, username)
+            if info is not None:
+                return info
 
-            for account in accounts:
-                try:
-                    await self.check_account_for_new_video(account)
-                    await asyncio.sleep(2)  # Délai entre chaque vérification
-                except Exception as e:
-                    logging.error(
-                        f"❌ Erreur lors de la vérification de @{account['tiktok_username']}: {e}"
-                    )
+        url = f"https://www.tiktok.com/@{username}"
 
-        finally:
-            self.checking = False
+        ydl_opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "extract_flat": True,
+            # Plusieurs vidéos : les épinglées passent en tête de liste
+            "playlist_items": f"1-{FALLBACK_ITEMS}",
+        }
 
-    @check_new_videos.before_loop
-    async def before_check_new_videos(self):
-        """Attendre que le bot soit prêt"""
-        await self.bot.wait_until_ready()
+        async with self.extraction_slots:
+            await tiktok_rate_limiter.acquire()
+            info = await extraction_service.extract(url, ydl_opts)
+        # Même choix de « dernière vidéo » que le chemin rapide
+        return with_latest_entry(info) if info else info
 
-    async def check_account_for_new_video(self, account: dict):
-        """Vérifie si un compte a une nouvelle vidéo ou un live actif"""
-        username = account["tiktok_username"]
+    async def check_username(self, username: str) -> tuple[dict | None, bool]:
+        """Récupère le flux d'un compte une seule fois et le distribue à tous ses abonnés
+
+        Retourne le flux lu (None si la récupération a échoué) et s'il
+        diffère du dernier flux distribué.
+        """
+        try:
+            info = await self.fetch_tiktok_feed(username)
+        except Exception as e:
+            logging.error(f"❌ Erreur lors de la vérification de @{username}: {e}")
+            return None, False
+
+        if not info:
+            return None, False
+
+        # Flux identique au précédent : rien à notifier ni à écrire par abonné
+        digest = feed_digest(info)
+        if feed_digests.unchanged(username, digest):
+            return info, False
+
+        if await self.fan_out(username, info):
+            feed_digests.remember(username, digest)
+        return info, True
+
+    async def check_live(self, username: str) -> dict | None:
+        """Sonde le statut de live ; extraction complète uniquement s'il a changé
+
+        Retourne le résultat de la sonde, ou None si elle a échoué.
+        """
+        if self.http is None:
+            return None
+        probe = await probe_live(self.http, username)
+        if probe is None:
+            return None
+
+        state = tiktok_tracker.get_account_state(username)
+        if live_changed(state, probe["is_live"], probe["room_id"]):
+            self.poll_stats["escalations"] += 1
+            await self.escalate_live(username, probe)
+        return probe
+
+    async def escalate_live(self, username: str, probe: dict):
+        """Début ou fin de live : extraction complète puis notification des abonnés"""
+        try:
+            info = await self.fetch_tiktok_feed(username) or {}
+        except Exception as e:
+            logging.warning(f"⚠️ Extraction de @{username} impossible après changement de live : {e}")
+            info = {}
+
+        live_info = dict(info)
+        live_info["is_live"] = probe["is_live"]
+        if probe["is_live"]:
+            live_info["id"] = probe["room_id"] or info.get("id")
+            live_info["url"] = f"https://www.tiktok.com/@{username}/live"
+            live_info["title"] = probe["title"] or info.get("title", "Live TikTok")
+            live_info["thumbnail"] = probe["thumbnail"] or info.get("thumbnail")
+        await self.fan_out(username, live_info, live_authoritative=True)
+
+    async def fan_out(self, username: str, info: dict, live_authoritative: bool = False) -> bool:
+        """Applique un flux lu à chaque abonnement (guild, utilisateur) du compte
+
+        Retourne False si au moins un abonnement n'a pas pu être traité
+        (serveur indisponible, salon absent, erreur) : à retenter au prochain flux.
+        """
+        ok = True
+        for account in tiktok_tracker.get_subscriptions(username):
+            try:
+                if not await self.check_account_for_new_video(account, info, live_authoritative):
+                    ok = False
+            except Exception as e:
+                ok = False
+                logging.error(
+                    f"❌ Erreur lors de la notification de @{username} (serveur {account['guild_id']}): {e}"
+                )
+        return ok
+
+    async def check_account_for_new_video(
+        self, account: dict, info: dict, live_authoritative: bool = False
+    ) -> bool:
+        """Compare le flux récupéré à l'état d'un abonnement (nouvelle vidéo ou live actif)
+
+        Le statut de live n'est pris en compte que s'il vient de la sonde
+        (`live_authoritative`) ou si le flux signale un live en cours.
+        Retourne False si l'abonnement n'a pas pu être traité (serveur pas
+        en cache ou sans salon TikTok).
+        """
         guild = self.bot.get_guild(account["guild_id"])
         if not guild:
-            return
+            return False
 
         # Trouver le canal TikTok
         tiktok_channel = self.get_tiktok_channel(guild)
         if not tiktok_channel:
-            return
+            return False
 
-        url = f"https://www.tiktok.com/@{username}"
+        if live_authoritative or info.get("is_live", False):
+            await self.update_account_live(account, info, tiktok_channel)
 
-        ydl_opts = {
-            "quiet": True,
-            "no_warnings": True,
-            "extract_flat": True,
-            "playlist_items": "1",
-        }
+        # Vérifier les vidéos normales
+        if "entries" not in info or not info["entries"]:
+            return True
 
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:  # type: ignore
-                info = await asyncio.to_thread(ydl.extract_info, url, download=False)
-
-                if not info:
-                    return
-
-                # Vérifier si c'est un live
-                is_live = info.get("is_live", False)
-
-                if is_live:
-                    # C'est un live !
-                    live_id = info.get("id") or info.get("display_id")
-
-                    # Vérifier si on a déjà notifié ce live
-                    if not account.get("is_live", False) or live_id != account.get(
-                        "last_live_id"
-                    ):
-                        await self.post_live_notification(account, info, tiktok_channel)  # type: ignore
-                        if live_id:
-                            tiktok_tracker.update_live_status(
-                                account["guild_id"], account["user_id"], True, live_id  # type: ignore
-                            )
-                    return
-                else:
-                    # Si l'utilisateur était en live et ne l'est plus, mettre à jour le statut
-                    if account.get("is_live", False):
-                        tiktok_tracker.update_live_status(
-                            account["guild_id"], account["user_id"], False
-                        )
-
-                # Vérifier les vidéos normales
-                if "entries" not in info or not info["entries"]:
-                    return
-
-                latest_video = info["entries"][0]
-                video_id = latest_video.get("id")
-
-                if not video_id:
-                    return
-
-                # Si c'est la première vérification, juste sauvegarder l'ID
-                if account["last_video_id"] is None:
-                    tiktok_tracker.update_last_video(
-                        account["guild_id"], account["user_id"], video_id
-                    )
-                    return
+        latest_video = info["entries"][0]
+        video_id = latest_video.get("id")
 
-                # Si c'est une nouvelle vidéo
-                if video_id != account["last_video_id"]:
-                    await self.post_new_video(account, latest_video, tiktok_channel)
-                    tiktok_tracker.update_last_video(
-                        account["guild_id"], account["user_id"], video_id
-                    )
+        if not video_id:
+            return True
 
-        except Exception as e:
-            logging.error(f"❌ Erreur lors de la vérification de @{username}: {e}")
+        # Si c'est la première vérification, juste sauvegarder l'ID
+        if account["last_video_id"] is None:
+            tiktok_tracker.update_last_video(
+                account["guild_id"], account["user_id"], video_id
+            )
+            return True
+
+        # Si c'est une nouvelle vidéo
+        if video_id != account["last_video_id"]:
+            await self.post_new_video(account, latest_video, tiktok_channel)
+            tiktok_tracker.update_last_video(
+                account["guild_id"], account["user_id"], video_id
+            )
+        return True
+
+    async def update_account_live(
+        self, account: dict, info: dict, tiktok_channel: discord.TextChannel
+    ):
+        """Notifie un live qui commence et met à jour le statut de l'abonnement"""
+        if info.get("is_live", False):
+            # C'est un live !
+            live_id = info.get("id") or info.get("display_id")
+
+            # Vérifier si on a déjà notifié ce live
+            if not account.get("is_live", False) or live_id != account.get(
+                "last_live_id"
+            ):
+                await self.post_live_notification(account, info, tiktok_channel)  # type: ignore
+                if live_id:
+                    tiktok_tracker.update_live_status(
+                        account["guild_id"], account["user_id"], True, live_id  # type: ignore
+                    )
+        elif account.get("is_live", False):
+            # Si l'utilisateur était en live et ne l'est plus, mettre à jour le statut
+            tiktok_tracker.update_live_status(
+                account["guild_id"], account["user_id"], False
+            )
 
     async def post_live_notification(
         self, account: dict, live_info: dict, channel: discord.TextChannel
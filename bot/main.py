@@ -5,7 +5,7 @@ from discord.ext import commands
 from dotenv import load_dotenv
 import sys
 import signal
-from server import keep_alive
+import asyncio
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
@@ -31,6 +31,7 @@ class MyBot(commands.Bot):
             command_prefix=["/"],
             intents=intents,
         )
+        self._drained = False
 
     async def setup_hook(self):
         # Charger les extensions
@@ -47,17 +48,50 @@ class MyBot(commands.Bot):
         await self.tree.sync()
         logging.info("✅ Commandes slash synchronisées")
 
+        # Arrêt propre sur SIGTERM (docker stop, redéploiement) pour vider la file des stats
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.create_task(self.close())
+            )
+        except NotImplementedError:
+            pass  # Non supporté sous Windows
+
+    async def close(self):
+        # Imports locaux : les processus d'extraction réimportent ce module et
+        # ne doivent pas ouvrir les stats (ces modules lisent aussi .env)
+        from utils.download_executor import download_executor
+        from utils.extraction_service import extraction_service
+        from utils.media_cache import media_cache
+        from utils.stats_manager import stats_manager
+        from utils.tiktok_tracker import tiktok_tracker
+
+        # Tout écrire avant de fermer le client : une fois celui-ci fermé,
+        # bot.run annule les tâches restantes (dont celle du signal SIGTERM)
+        if not self._drained:
+            self._drained = True
+            await stats_manager.close()
+            await tiktok_tracker.flush()
+            media_cache.flush()
+            extraction_service.shutdown()
+            download_executor.shutdown()
+            logging.info("💾 Statistiques sauvegardées, arrêt du bot")
+        await super().close()
+
     async def on_ready(self):
         logging.info("🔑 Bot démarré avec succès")
         logging.info("📁 Version du bot : 1.0.0")
         logging.info(f"👤 Connecté en tant que {self.user}")
 
 
-bot = MyBot()
-
 # --- Lancer le bot ---
-if not TOKEN:
-    logging.error("❌ Le token Discord est introuvable dans le fichier .env")
-else:
-    keep_alive()
-    bot.run(TOKEN)
+# Les processus d'extraction ("spawn") réimportent ce module : le bot ne doit
+# démarrer que lorsque le fichier est exécuté directement
+if __name__ == "__main__":
+    from server import keep_alive
+
+    if not TOKEN:
+        logging.error("❌ Le token Discord est introuvable dans le fichier .env")
+    else:
+        bot = MyBot()
+        keep_alive()
+        bot.run(TOKEN)
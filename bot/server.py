@@ -8,6 +8,15 @@ import logging
 
 load_dotenv()
 
+# Importé après load_dotenv() : le backend de stats se configure via .env
+from utils.attachment_registry import attachment_registry
+from utils.download_executor import download_executor
+from utils.extraction_service import extraction_service
+from utils.feed_digest import feed_digests
+from utils.media_cache import media_cache
+from utils.stats_manager import stats_manager
+from utils.tiktok_profile import profile_stats
+
 app = Flask("")
 
 
@@ -23,7 +32,16 @@ def ping():
 
 @app.route("/health")
 def health():
-    return {"status": "alive", "timestamp": time.time()}
+    return {
+        "status": "alive",
+        "timestamp": time.time(),
+        "stats_writer": stats_manager.get_writer_metrics(),
+        "extraction": extraction_service.metrics(),
+        "downloads": download_executor.metrics(),
+        "media_cache": media_cache.metrics(),
+        "attachments": attachment_registry.metrics(),
+        "tiktok_feed": {**profile_stats, "digest": feed_digests.metrics()},
+    }
 
 
 def run():
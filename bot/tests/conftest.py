@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Ajouter le dossier du bot au path pour importer utils
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
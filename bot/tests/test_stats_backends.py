@@ -0,0 +1,192 @@
+"""Conformité des backends de statistiques
+
+Chaque backend (memory, json, eventlog, sqlite) enregistre la même charge
+synthétique ; ses réponses sont comparées aux valeurs attendues,
+recalculées directement à partir de la charge. Les ex aequo pouvant être
+ordonnés différemment selon le backend, les classements sont comparés par
+nombre de téléchargements.
+"""
+import asyncio
+import contextlib
+import os
+import random
+from collections import Counter, defaultdict
+
+import pytest
+
+from utils.stats_backend import StatsBackend
+from utils.stats_manager import MemoryStatsManager, StatsManager
+from utils.stats_sqlite import SQLiteStatsManager
+
+PLATFORMS = ("instagram", "pinterest", "tiktok")
+BACKENDS = ("memory", "json", "eventlog", "sqlite")
+USERS = 200
+DOWNLOADS = 3000
+
+
+def make_backend(name: str, workdir: str):
+    """Instancie un backend dont les fichiers vivent dans `workdir`"""
+    if name == "memory":
+        return MemoryStatsManager()
+    if name in ("json", "eventlog"):
+        # Checkpoints fréquents : le journal est replié plusieurs fois pendant la charge
+        return StatsManager(os.path.join(workdir, "stats.json"), storage_mode=name, checkpoint_every=200)
+    return SQLiteStatsManager(os.path.join(workdir, "stats.sqlite3"))
+
+
+def synthetic_downloads(seed: int = 7):
+    """Téléchargements (user_id, platform, url) : quelques vidéos très populaires, une longue traîne"""
+    rng = random.Random(seed)
+    videos = DOWNLOADS // 10
+    for _ in range(DOWNLOADS):
+        video = int(rng.paretovariate(1.2)) % videos
+        yield rng.randint(1, USERS), PLATFORMS[video % len(PLATFORMS)], f"https://example.com/v/{video}"
+
+
+class Expected:
+    """Valeurs attendues, recalculées à partir de la charge"""
+
+    def __init__(self, workload):
+        self.users = Counter(str(user_id) for user_id, _, _ in workload)
+        self.videos = Counter(url for _, _, url in workload)
+        self.platforms = Counter(platform for _, platform, _ in workload)
+        self.user_platforms = defaultdict(Counter)
+        self.downloaders = defaultdict(set)
+        self.video_platform = {}
+        for user_id, platform, url in workload:
+            self.user_platforms[str(user_id)][platform] += 1
+            self.downloaders[url].add(user_id)
+            self.video_platform[url] = platform
+
+    def rank(self, user_id: int) -> int:
+        count = self.users.get(str(user_id), 0)
+        if not count:
+            return 0
+        return 1 + sum(1 for other in self.users.values() if other > count)
+
+
+WORKLOAD = list(synthetic_downloads())
+EXPECTED = Expected(WORKLOAD)
+
+
+def top_counts(counter: Counter, limit: int):
+    return sorted(counter.values(), reverse=True)[:limit]
+
+
+@pytest.fixture(scope="module", params=BACKENDS)
+def stats(request, tmp_path_factory):
+    """Backend alimenté avec la charge, et de quoi exécuter ses coroutines"""
+    loop = asyncio.new_event_loop()
+    workdir = str(tmp_path_factory.mktemp(request.param))
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        backend = make_backend(request.param, workdir)
+
+        async def populate():
+            for i, (user_id, platform, url) in enumerate(WORKLOAD, start=1):
+                await backend.record_download(user_id, f"user{user_id}", platform, url, f"Vidéo {url}")
+                if i % 100 == 0:
+                    await asyncio.sleep(0)  # Laisse passer l'écriture différée
+            await backend.checkpoint()
+
+        loop.run_until_complete(populate())
+    yield backend, loop.run_until_complete
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        loop.run_until_complete(backend.close())
+    loop.close()
+
+
+def test_implements_backend(stats):
+    backend, _ = stats
+    assert isinstance(backend, StatsBackend)
+
+
+def test_global_counts(stats):
+    backend, run = stats
+    global_stats = run(backend.get_global_stats())
+    assert global_stats["total_downloads"] == DOWNLOADS
+    assert global_stats["total_users"] == len(EXPECTED.users)
+    assert global_stats["total_videos"] == len(EXPECTED.videos)
+    assert {k: v for k, v in global_stats["platforms"].items() if v} == dict(EXPECTED.platforms)
+
+
+@pytest.mark.parametrize("user_id", [0, 1, 7, 42, 99, 150, USERS])
+def test_user_stats(stats, user_id):
+    backend, run = stats
+    user = run(backend.get_user_stats(user_id))
+    assert user["downloads"] == EXPECTED.users.get(str(user_id), 0)
+    assert {k: v for k, v in user["platforms"].items() if v} == dict(EXPECTED.user_platforms.get(str(user_id), {}))
+
+
+@pytest.mark.parametrize("user_id", [0, 1, 7, 42, 99, 150, USERS, USERS + 1])
+def test_user_rank(stats, user_id):
+    backend, run = stats
+    assert run(backend.get_user_rank(user_id)) == EXPECTED.rank(user_id)
+
+
+@pytest.mark.parametrize("limit", [1, 10, 50])
+def test_top_users(stats, limit):
+    backend, run = stats
+    top = run(backend.get_top_users(limit))
+    assert [user["downloads"] for _, user in top] == top_counts(EXPECTED.users, limit)
+    assert all(user["downloads"] == EXPECTED.users[uid] for uid, user in top)
+
+
+@pytest.mark.parametrize("limit", [1, 10, 50])
+def test_top_videos(stats, limit):
+    backend, run = stats
+    top = run(backend.get_top_videos(limit))
+    assert [video["downloads"] for _, video in top] == top_counts(EXPECTED.videos, limit)
+    assert all(video["downloads"] == EXPECTED.videos[url] for url, video in top)
+
+
+@pytest.mark.parametrize("url", [f"https://example.com/v/{i}" for i in (0, 1, 2, 13, 57, 299)] + ["https://example.com/absente"])
+def test_video_unique_users(stats, url):
+    backend, run = stats
+    video = run(backend.get_video_stats(url))
+    if url not in EXPECTED.videos:
+        assert video is None
+        return
+    assert video["downloads"] == EXPECTED.videos[url]
+    assert video["unique_users"] == len(EXPECTED.downloaders[url])
+
+
+@pytest.mark.parametrize("platform", [None, *PLATFORMS])
+def test_trending_videos(stats, platform):
+    """Charge enregistrée en quelques secondes : la tendance suit le nombre de téléchargements"""
+    backend, run = stats
+    trending = run(backend.get_trending_videos(5, platform))
+    expected = Counter({
+        url: count for url, count in EXPECTED.videos.items()
+        if platform is None or EXPECTED.video_platform[url] == platform
+    })
+    assert [video["downloads"] for _, video, _ in trending] == top_counts(expected, 5)
+    assert all(url in expected for url, _, _ in trending)
+    scores = [score for _, _, score in trending]
+    assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("granularity", ["hour", "day"])
+def test_rollup_totals(stats, granularity):
+    """Deux tranches : la charge peut chevaucher un changement d'heure"""
+    backend, run = stats
+    assert run(backend.get_window_total("platforms", None, granularity, 2)) == DOWNLOADS
+    for platform, count in EXPECTED.platforms.items():
+        assert run(backend.get_window_total("platforms", platform, granularity, 2)) == count
+    assert run(backend.get_window_total("users", "1", granularity, 2)) == EXPECTED.users.get("1", 0)
+
+
+@pytest.mark.parametrize("dimension", ["platforms", "users", "videos"])
+def test_rollup_top(stats, dimension):
+    backend, run = stats
+    expected = {"platforms": EXPECTED.platforms, "users": EXPECTED.users, "videos": EXPECTED.videos}[dimension]
+    top = run(backend.get_window_top(dimension, 10, "day", 7))
+    assert [count for _, count in top] == top_counts(expected, 10)
+    assert all(expected[key] == count for key, count in top)
+
+
+def test_snapshot_matches_backend(stats):
+    backend, run = stats
+    snapshot = run(backend.snapshot())
+    assert run(snapshot.get_global_stats())["total_downloads"] == DOWNLOADS
+    assert [user["downloads"] for _, user in run(snapshot.get_top_users(10))] == top_counts(EXPECTED.users, 10)
+    assert run(snapshot.get_user_rank(42)) == EXPECTED.rank(42)
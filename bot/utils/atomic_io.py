@@ -0,0 +1,29 @@
+import json
+import os
+import tempfile
+from typing import Any
+
+
+def write_json_atomic(path: str, data: Any, **dump_kwargs):
+    """Écrit un fichier JSON de manière atomique (fichier temporaire + rename)
+
+    Le fichier cible contient soit l'ancienne version, soit la nouvelle,
+    jamais un document tronqué en cas de crash pendant l'écriture.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    dump_kwargs.setdefault("ensure_ascii", False)
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+import discord
+
+from utils.atomic_io import write_json_atomic
+
+# Nombre maximal de pièces jointes mémorisées (les moins récemment réutilisées sont oubliées)
+ATTACHMENT_REGISTRY_MAX = int(os.getenv("ATTACHMENT_REGISTRY_MAX", 5000))
+# Un lien signé qui expire dans moins de ce délai est renouvelé avant d'être partagé (secondes)
+EXPIRY_MARGIN = 3600
+
+
+def link_expiry(url: str) -> Optional[float]:
+    """Date d'expiration d'un lien CDN Discord signé (paramètre `ex`, hexadécimal)"""
+    try:
+        return float(int(parse_qs(urlparse(url).query)["ex"][0], 16))
+    except (KeyError, ValueError, IndexError):
+        return None
+
+
+class AttachmentRegistry:
+    """Pièces jointes Discord déjà envoyées, par identifiant canonique de média
+
+    Une vidéo déjà envoyée une fois est repartagée par son lien CDN au lieu
+    d'être envoyée à nouveau. Les liens sont signés et expirent : un lien
+    proche de l'expiration est renouvelé en relisant le message d'origine
+    (salon et message mémorisés). Un message supprimé fait oublier l'entrée.
+    """
+
+    def __init__(self, data_file="data/attachments.json", max_entries: Optional[int] = None):
+        self.data_file = data_file
+        self.max_entries = max_entries or ATTACHMENT_REGISTRY_MAX
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.reuses = 0
+        self.refreshes = 0
+        self.uploads = 0
+        self.load_data()
+
+    def load_data(self):
+        """Charge les pièces jointes mémorisées"""
+        if not os.path.exists(self.data_file):
+            return
+        try:
+            with open(self.data_file, "r", encoding="utf-8") as f:
+                self._entries = OrderedDict(json.load(f)["entries"])
+        except Exception as e:
+            logging.error(f"❌ Erreur lors du chargement des pièces jointes: {e}")
+
+    async def save_data(self):
+        """Sauvegarde atomique hors de la boucle"""
+        snapshot = {"entries": list(self._entries.items())}
+        try:
+            await asyncio.to_thread(write_json_atomic, self.data_file, snapshot)
+        except Exception as e:
+            logging.error(f"❌ Erreur lors de la sauvegarde des pièces jointes: {e}")
+
+    async def record(self, key: str, message: Optional[discord.Message], title: str):
+        """Mémorise la pièce jointe d'un message que le bot vient d'envoyer"""
+        if message is None or not message.attachments:
+            return
+        url = message.attachments[0].url
+        self._entries[key] = {
+            "channel_id": message.channel.id,
+            "message_id": message.id,
+            "url": url,
+            "expires_at": link_expiry(url),
+            "title": title,
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.uploads += 1
+        await self.save_data()
+
+    async def _refresh(self, bot: discord.Client, key: str, entry: Dict) -> Optional[Dict]:
+        """Relit le message d'origine pour obtenir un lien signé neuf"""
+        try:
+            channel = bot.get_channel(entry["channel_id"]) or await bot.fetch_channel(entry["channel_id"])
+            message = await channel.fetch_message(entry["message_id"])  # type: ignore
+        except (discord.NotFound, discord.Forbidden):
+            # Message supprimé ou salon inaccessible : la vidéo sera renvoyée
+            self._entries.pop(key, None)
+            await self.save_data()
+            return None
+        if not message.attachments:
+            self._entries.pop(key, None)
+            await self.save_data()
+            return None
+
+        entry = dict(entry, url=message.attachments[0].url)
+        entry["expires_at"] = link_expiry(entry["url"])
+        self._entries[key] = entry
+        self.refreshes += 1
+        await self.save_data()
+        return entry
+
+    async def resolve(self, bot: discord.Client, key: str) -> Optional[Dict]:
+        """Pièce jointe réutilisable pour un média ({"url", "title", ...}), ou None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at = entry.get("expires_at")
+        if expires_at is not None and expires_at - time.time() < EXPIRY_MARGIN:
+            try:
+                entry = await self._refresh(bot, key, entry)
+            except Exception as e:
+                logging.warning(f"⚠️ Renouvellement du lien de {key} impossible : {e}")
+                return None
+            if entry is None:
+                return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def reply_with_attachment(
+        self, bot: discord.Client, key: str, interaction: discord.Interaction, send_to_channel: bool
+    ) -> Optional[Dict]:
+        """Partage la pièce jointe existante d'un média (None si aucune n'a pu être partagée)"""
+        entry = await self.resolve(bot, key)
+        if entry is None:
+            return None
+        content = f"✅ Téléchargement terminé : {entry['url']}"
+        try:
+            if send_to_channel:
+                await interaction.followup.send(content=f"{interaction.user.mention} {content}")
+            else:
+                await interaction.user.send(content=content)
+        except Exception as e:
+            logging.warning(f"⚠️ Partage de la pièce jointe existante impossible : {e}")
+            return None
+        self.reuses += 1
+        return entry
+
+    def metrics(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "reuses": self.reuses,
+            "refreshes": self.refreshes,
+            "uploads": self.uploads,
+        }
+
+
+# Instance globale
+attachment_registry = AttachmentRegistry()
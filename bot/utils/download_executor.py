@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Union
+
+import yt_dlp
+from yt_dlp.utils import DownloadCancelled
+
+# Téléchargements simultanés et délai maximal par téléchargement (secondes)
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", 2))
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", 300))
+
+
+class DownloadError(Exception):
+    """Téléchargement échoué, expiré ou annulé"""
+
+
+@dataclass
+class DownloadResult:
+    """Fichier téléchargé et métadonnées yt-dlp correspondantes"""
+
+    info: Dict
+    filepath: str
+    title: str
+    filesize: int
+    elapsed: float
+
+
+class DownloadExecutor:
+    """Téléchargements yt-dlp dans un pool de threads dédié
+
+    Le transfert ne bloque plus la boucle (passerelle Discord, autres
+    commandes) et plusieurs téléchargements se chevauchent. Les hooks de
+    progression restent dans ce processus. Un téléchargement expiré ou
+    annulé est interrompu au prochain appel de hook (DownloadCancelled),
+    et ses fichiers partiels sont supprimés.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_workers = max_workers or DOWNLOAD_WORKERS
+        self.timeout = timeout or DOWNLOAD_TIMEOUT
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="download")
+
+        # Métriques exposées via /health
+        self.jobs = 0
+        self.active = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    @staticmethod
+    def _run(source: Union[str, Dict], opts: Dict, cancel: threading.Event) -> DownloadResult:
+        """Exécuté dans un thread : télécharge une URL ou un résultat d'extraction"""
+        if cancel.is_set():
+            raise DownloadCancelled()
+        files: Set[str] = set()
+
+        def cancel_hook(d):
+            for key in ("tmpfilename", "filename"):
+                if d.get(key):
+                    files.add(d[key])
+            if cancel.is_set():
+                raise DownloadCancelled()
+
+        opts = {**opts, "progress_hooks": [cancel_hook, *opts.get("progress_hooks", [])]}
+        start = time.perf_counter()
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:  # type: ignore
+                if isinstance(source, dict):
+                    info = ydl.process_ie_result(source, download=True)
+                else:
+                    info = ydl.extract_info(source, download=True)
+                requested = (info.get("requested_downloads") or [{}])[0]
+                filepath = requested.get("filepath") or ydl.prepare_filename(info)
+        except BaseException:
+            for path in files:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+
+        return DownloadResult(
+            info=info,
+            filepath=filepath,
+            title=info.get("title") or "Vidéo",
+            filesize=os.path.getsize(filepath),
+            elapsed=time.perf_counter() - start,
+        )
+
+    async def download(
+        self, source: Union[str, Dict], opts: Dict, timeout: Optional[float] = None
+    ) -> DownloadResult:
+        """Télécharge hors de la boucle (`source` : URL ou résultat d'extract_info)
+
+        Lève DownloadError si le téléchargement échoue ou dépasse le délai.
+        L'annulation de la tâche appelante interrompt le téléchargement.
+        """
+        loop = asyncio.get_running_loop()
+        timeout = timeout or self.timeout
+        cancel = threading.Event()
+        self.jobs += 1
+        self.active += 1
+        try:
+            future = loop.run_in_executor(self._executor, self._run, source, opts, cancel)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            cancel.set()
+            self.timeouts += 1
+            raise DownloadError(f"Délai de téléchargement dépassé ({timeout:.0f}s)") from None
+        except asyncio.CancelledError:
+            cancel.set()
+            self.cancelled += 1
+            raise
+        except Exception as e:
+            self.errors += 1
+            logging.warning(f"⚠️ Téléchargement échoué : {e}")
+            raise DownloadError(str(e)) from e
+        finally:
+            self.active -= 1
+
+    def shutdown(self):
+        """Arrête le pool (arrêt du bot) sans attendre les téléchargements en cours"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> Dict:
+        return {
+            "workers": self.max_workers,
+            "jobs": self.jobs,
+            "active": self.active,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+        }
+
+
+# Instance globale
+download_executor = DownloadExecutor()
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+import yt_dlp
+
+# Processus d'extraction, délai maximal par extraction (secondes) et
+# nombre d'extractions avant remplacement d'un processus (fuites mémoire de yt-dlp)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", 2))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", 60))
+EXTRACTION_MAX_JOBS_PER_WORKER = int(os.getenv("EXTRACTION_MAX_JOBS_PER_WORKER", 50))
+
+
+class ExtractionError(Exception):
+    """Échec d'extraction renvoyé par un processus (message seul, toujours picklable)"""
+
+
+# --- Côté processus d'extraction ---
+
+# Une instance YoutubeDL par jeu d'options, réutilisée d'une extraction à l'autre
+_ydl_cache: Dict[str, "yt_dlp.YoutubeDL"] = {}
+
+
+def _extract(url: str, opts: Dict) -> Optional[Dict]:
+    """Exécuté dans un processus d'extraction : métadonnées sans téléchargement"""
+    key = json.dumps(opts, sort_keys=True)
+    ydl = _ydl_cache.get(key)
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(opts)  # type: ignore
+        _ydl_cache[key] = ydl
+    try:
+        info = ydl.extract_info(url, download=False)
+    except Exception as e:
+        # Les exceptions yt-dlp portent une traceback : on ne renvoie que le message
+        raise ExtractionError(str(e)) from None
+    return ydl.sanitize_info(info) if info else None
+
+
+# --- Côté bot ---
+
+class ExtractionService:
+    """Extractions yt-dlp dans un pool de processus
+
+    Le travail CPU de yt-dlp (regex, JSON, signatures) ne dispute plus le
+    GIL à la passerelle Discord. Les processus vivent longtemps et gardent
+    leurs instances YoutubeDL ; ils sont remplacés après
+    `max_jobs_per_worker` extractions. Une extraction qui dépasse le délai
+    fait redémarrer le pool (un processus bloqué ne peut pas être annulé).
+
+    Les options doivent être sérialisables en JSON : pas de hooks de
+    progression, le téléchargement lui-même reste dans le processus du bot.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_jobs_per_worker: Optional[int] = None,
+    ):
+        self.max_workers = max_workers or EXTRACTION_WORKERS
+        self.timeout = timeout or EXTRACTION_TIMEOUT
+        self.max_jobs_per_worker = max_jobs_per_worker or EXTRACTION_MAX_JOBS_PER_WORKER
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs_since_recycle = 0
+        self._closed = False
+
+        # Métriques exposées via /health
+        self.jobs = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.recycles = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Crée le pool à la première extraction (aucun processus au simple import)"""
+        if self._closed:
+            raise ExtractionError("Service d'extraction arrêté")
+        if self._pool is None:
+            kwargs = {
+                "max_workers": self.max_workers,
+                # "spawn" : pas de fork d'un processus qui a déjà des threads
+                "mp_context": multiprocessing.get_context("spawn"),
+            }
+            if sys.version_info >= (3, 11):
+                kwargs["max_tasks_per_child"] = self.max_jobs_per_worker
+            self._pool = ProcessPoolExecutor(**kwargs)
+            self._jobs_since_recycle = 0
+        return self._pool
+
+    def _recycle(self, pool: ProcessPoolExecutor, reason: str, terminate: bool):
+        """Remplace `pool` s'il est toujours le pool courant ; `terminate` tue les processus encore occupés
+
+        Un pool déjà remplacé (par le délai d'une autre extraction) n'est
+        pas recyclé une seconde fois : le nouveau pool reste en place.
+        """
+        if self._pool is not pool:
+            return
+        self._pool = None
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=terminate)
+        if terminate:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+        self.recycles += 1
+        logging.warning(f"♻️ Pool d'extraction redémarré : {reason}")
+
+    async def _run(self, pool: ProcessPoolExecutor, url: str, opts: Dict, timeout: float) -> Optional[asyncio.Future]:
+        """Soumet une extraction à `pool` ; retourne son futur terminé, ou None après le délai
+
+        asyncio.wait ne propage pas l'annulation du futur par le pool
+        (arrêt, recyclage) : elle est traitée par l'appelant, et seule
+        l'annulation de la tâche appelante lève CancelledError.
+        """
+        future = asyncio.get_running_loop().run_in_executor(pool, _extract, url, opts)
+        try:
+            await asyncio.wait({future}, timeout=timeout)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        if not future.done():
+            future.cancel()
+            self._recycle(pool, f"extraction de {url} bloquée plus de {timeout:.0f}s", terminate=True)
+            return None
+        return future
+
+    async def extract(self, url: str, opts: Dict, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Métadonnées d'une URL (équivalent de extract_info(download=False))
+
+        Une extraction perdue parce qu'une autre a fait redémarrer le pool
+        est relancée une fois sur le nouveau pool, dans le délai restant :
+        elle ne compte pas comme un échec du compte ou du lien.
+        """
+        timeout = timeout or self.timeout
+        start = time.perf_counter()
+        try:
+            for _ in range(2):
+                remaining = timeout - (time.perf_counter() - start)
+                pool = self._get_pool()
+                future = await self._run(pool, url, opts, remaining) if remaining > 0 else None
+                if future is None:
+                    self.timeouts += 1
+                    raise ExtractionError(f"Délai d'extraction dépassé ({timeout:.0f}s)")
+                if not future.cancelled() and not isinstance(future.exception(), BrokenProcessPool):
+                    try:
+                        return future.result()
+                    except Exception:
+                        self.errors += 1
+                        raise
+                if self._pool is pool:
+                    # Ce pool s'est arrêté de lui-même (processus tué, mémoire épuisée...)
+                    self._recycle(pool, "processus d'extraction arrêté brutalement", terminate=True)
+                    break
+            self.errors += 1
+            raise ExtractionError("Processus d'extraction arrêté")
+        finally:
+            self.jobs += 1
+            self.last_ms = (time.perf_counter() - start) * 1000
+            self.max_ms = max(self.max_ms, self.last_ms)
+            if sys.version_info < (3, 11) and self._pool is not None:
+                # Sans max_tasks_per_child : recyclage de tout le pool, les extractions en cours se terminent
+                self._jobs_since_recycle += 1
+                if self._jobs_since_recycle >= self.max_jobs_per_worker * self.max_workers:
+                    self._recycle(self._pool, "recyclage périodique", terminate=False)
+
+    def shutdown(self):
+        """Arrête les processus (arrêt du bot) ; les extractions en attente échouent avec ExtractionError"""
+        self._closed = True
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def metrics(self) -> Dict:
+        return {
+            "workers": self.max_workers,
+            "jobs": self.jobs,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "recycles": self.recycles,
+            "last_ms": round(self.last_ms, 1),
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+# Instance globale
+extraction_service = ExtractionService()
@@ -0,0 +1,53 @@
+import hashlib
+from typing import Dict
+
+# Nombre de vidéos les plus récentes prises en compte dans l'empreinte
+DIGEST_ENTRIES = 5
+
+
+def feed_digest(info: Dict) -> str:
+    """Empreinte de la partie utile d'un flux : dernières vidéos et statut de live"""
+    ids = [str(entry.get("id")) for entry in (info.get("entries") or [])[:DIGEST_ENTRIES] if entry]
+    live = f"live:{info.get('id')}" if info.get("is_live") else "offline"
+    return hashlib.blake2b("|".join(ids + [live]).encode(), digest_size=16).hexdigest()
+
+
+class FeedDigests:
+    """Dernière empreinte de flux par compte TikTok
+
+    Un flux identique au précédent n'a rien à notifier : la distribution
+    aux abonnés est sautée. L'empreinte n'est retenue qu'après une
+    distribution réussie, et oubliée quand un abonné s'ajoute (son état
+    initial doit être enregistré).
+    """
+
+    def __init__(self):
+        self._digests: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def unchanged(self, username: str, digest: str) -> bool:
+        """Vrai si le flux est identique au dernier flux distribué"""
+        if self._digests.get(username.lower()) == digest:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def remember(self, username: str, digest: str):
+        self._digests[username.lower()] = digest
+
+    def forget(self, username: str):
+        self._digests.pop(username.lower(), None)
+
+    def metrics(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# Instance globale
+feed_digests = FeedDigests()
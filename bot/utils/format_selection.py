@@ -0,0 +1,72 @@
+from typing import Dict, List, Optional
+
+import discord
+
+# Limite d'envoi hors serveur (messages privés), en octets
+DEFAULT_UPLOAD_LIMIT = 8 * 1024 * 1024
+
+
+def upload_limit(guild: Optional[discord.Guild], in_dm: bool = False) -> int:
+    """Taille maximale d'un fichier envoyé dans un salon du serveur ou en message privé"""
+    if in_dm or guild is None:
+        return DEFAULT_UPLOAD_LIMIT
+    return guild.filesize_limit
+
+
+def format_size(fmt: Dict, duration: Optional[float] = None) -> Optional[int]:
+    """Taille connue ou estimée d'un format (débit total × durée), None si inconnue"""
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size:
+        return int(size)
+    if fmt.get("tbr") and duration:
+        return int(fmt["tbr"] * 1000 / 8 * duration)
+    return None
+
+
+def _candidates(info: Dict) -> List[Dict]:
+    """Formats contenant image et son dans un seul fichier (équivalent de 'best')"""
+    formats = info.get("formats") or [info]
+    return [
+        fmt for fmt in formats
+        if fmt.get("url") and fmt.get("vcodec") != "none" and fmt.get("acodec") != "none"
+    ]
+
+
+def _quality(fmt: Dict):
+    return (fmt.get("height") or 0, fmt.get("tbr") or 0, fmt.get("quality") or 0)
+
+
+def select_format(info: Dict, limit: int) -> Optional[Dict]:
+    """Meilleur format dont la taille tient dans `limit`, choisi avant tout téléchargement
+
+    Les formats de taille inconnue ne sont retenus qu'à défaut de format
+    de taille connue qui tienne (la taille sera vérifiée après coup).
+    Retourne None si tous les formats sont trop volumineux.
+    """
+    duration = info.get("duration")
+    fitting, unknown = [], []
+    for fmt in _candidates(info):
+        size = format_size(fmt, duration)
+        if size is None:
+            unknown.append(fmt)
+        elif size <= limit:
+            fitting.append(fmt)
+    if fitting:
+        return max(fitting, key=_quality)
+    if unknown:
+        return max(unknown, key=_quality)
+    return None
+
+
+def smallest_size(info: Dict) -> Optional[int]:
+    """Taille du plus petit format connu (pour le message « trop volumineuse »)"""
+    sizes = [size for size in (format_size(fmt, info.get("duration")) for fmt in _candidates(info)) if size]
+    return min(sizes) if sizes else None
+
+
+def direct_url(info: Dict) -> str:
+    """Lien direct vers la meilleure version de la vidéo (ou la page d'origine)"""
+    candidates = _candidates(info)
+    if candidates:
+        return max(candidates, key=_quality)["url"]
+    return info.get("url") or info.get("webpage_url") or ""
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from utils.atomic_io import write_json_atomic
+
+# Dossier et taille maximale du cache de médias (Mo)
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "data/media_cache")
+MEDIA_CACHE_MAX_MB = float(os.getenv("MEDIA_CACHE_MAX_MB", 500))
+
+# Identifiant canonique d'un média d'après son lien (les paramètres de partage sont ignorés)
+MEDIA_ID_PATTERNS = {
+    "instagram": re.compile(r"instagram\.com/(?:[\w.]+/)?(?:p|reels?|tv)/([\w-]+)"),
+    "pinterest": re.compile(r"pinterest\.[a-z.]+/pin/(?:[\w-]*--)?(\d+)"),
+}
+# Nom des fichiers du cache : empreinte de la clé + extension
+CACHE_FILE_PATTERN = re.compile(r"^[0-9a-f]{32}\.\w+$")
+
+
+def media_key(platform: str, url: str) -> Optional[str]:
+    """Clé de cache d'un lien (None si l'identifiant du média n'est pas reconnu)"""
+    pattern = MEDIA_ID_PATTERNS.get(platform)
+    match = pattern.search(url) if pattern else None
+    return f"{platform}:{match.group(1)}" if match else None
+
+
+class MediaCache:
+    """Cache disque des vidéos envoyées, indexé par identifiant canonique de média
+
+    Les fichiers sont nommés d'après l'empreinte de leur clé ; l'index
+    (ordre LRU, taille, titre) est écrit atomiquement dans `index.json` et
+    survit aux redémarrages. Au-delà de `max_bytes`, les médias les moins
+    récemment servis sont supprimés. Une insertion copie d'abord le fichier
+    dans le cache sous un nom temporaire puis le renomme : un fichier
+    présent dans l'index est toujours complet.
+
+    Un fichier retourné par `get` ou `put` est réservé jusqu'à `release` :
+    s'il est évincé entre-temps, il n'est supprimé qu'à sa libération.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = directory or MEDIA_CACHE_DIR
+        self.max_bytes = max_bytes or int(MEDIA_CACHE_MAX_MB * 1024 * 1024)
+        self.index_file = os.path.join(self.directory, "index.json")
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Écriture de l'index, hors du verrou des entrées (les lectures n'attendent pas le disque)
+        self._index_lock = threading.Lock()
+        # Fichiers en cours d'envoi (nombre de réservations) et fichiers évincés à supprimer à leur libération
+        self._pins: Dict[str, int] = {}
+        self._doomed: set = set()
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self):
+        """Relit l'index et supprime les fichiers orphelins (insertion interrompue)"""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    for key, entry in json.load(f)["entries"]:
+                        if os.path.exists(os.path.join(self.directory, entry["file"])):
+                            self._entries[key] = entry
+                            self.total_bytes += entry["size"]
+            except Exception as e:
+                logging.error(f"❌ Index du cache de médias illisible, cache vidé : {e}")
+                self._entries.clear()
+                self.total_bytes = 0
+
+        # Seuls les fichiers créés par le cache sont supprimés
+        known = {entry["file"] for entry in self._entries.values()}
+        for name in os.listdir(self.directory):
+            if name not in known and (name.startswith(".") or CACHE_FILE_PATTERN.match(name)):
+                os.remove(os.path.join(self.directory, name))
+
+    def _save_index(self):
+        """Écrit l'index ; le verrou des entrées n'est tenu que le temps de la copie"""
+        with self._index_lock:
+            with self._lock:
+                entries = [(key, dict(entry)) for key, entry in self._entries.items()]
+            write_json_atomic(self.index_file, {"entries": entries})
+
+    def _path(self, entry: Dict) -> str:
+        return os.path.join(self.directory, entry["file"])
+
+    def _pin(self, name: str):
+        self._pins[name] = self._pins.get(name, 0) + 1
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Média en cache : {"path", "size", "title"}, ou None
+
+        Le fichier est réservé : appeler `release(path)` une fois envoyé.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not os.path.exists(self._path(entry)):
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry["last_used"] = time.time()
+            self.hits += 1
+            self._pin(entry["file"])
+            return {"path": self._path(entry), "size": entry["size"], "title": entry["title"]}
+
+    def release(self, path: str):
+        """Libère un fichier obtenu par `get` ou `put` ; supprime-le s'il a été évincé entre-temps"""
+        name = os.path.basename(path)
+        with self._lock:
+            remaining = self._pins.get(name, 0) - 1
+            if remaining > 0:
+                self._pins[name] = remaining
+                return
+            self._pins.pop(name, None)
+            if name not in self._doomed:
+                return
+            self._doomed.discard(name)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def put(self, key: str, source: str, title: str) -> Optional[str]:
+        """Ajoute un fichier au cache (déplacé) ; retourne son chemin réservé (voir `get`)
+
+        Retourne None, sans déplacer le fichier, s'il est trop gros ou si la
+        version en cache est en cours d'envoi. Bloquant (copie du fichier) :
+        à appeler via asyncio.to_thread.
+        """
+        size = os.path.getsize(source)
+        if size > self.max_bytes:
+            return None
+        ext = os.path.splitext(source)[1] or ".mp4"
+        name = hashlib.sha256(key.encode()).hexdigest()[:32] + ext
+        with self._lock:
+            if name in self._pins:
+                return None  # Ne jamais remplacer un fichier en cours d'envoi
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.move(source, tmp_path)
+            with self._lock:
+                # Réservé entre-temps par une autre demande du même média : le fichier est rendu
+                raced = name in self._pins
+                if not raced:
+                    if key in self._entries:
+                        self._drop(key)
+                    os.replace(tmp_path, os.path.join(self.directory, name))
+                    self._entries[key] = {"file": name, "size": size, "title": title, "last_used": time.time()}
+                    self.total_bytes += size
+                    self._evict()
+                    self._pin(name)
+            if raced:
+                shutil.move(tmp_path, source)
+                return None
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._save_index()
+        return os.path.join(self.directory, name)
+
+    def put_bytes(self, key: str, data: bytes, title: str, ext: str = ".mp4") -> Optional[str]:
+        """Ajoute un média téléchargé en mémoire (voir `put`)"""
+        if len(data) > self.max_bytes:
+            return None
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=ext)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        path = self.put(key, tmp_path, title)
+        if path is None:
+            os.remove(tmp_path)
+        return path
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry["size"]
+        if entry["file"] in self._pins:
+            self._doomed.add(entry["file"])  # Supprimé par `release`
+            return
+        try:
+            os.remove(self._path(entry))
+        except OSError:
+            pass  # Fichier absent, ou en cours d'envoi sous Windows
+
+    def _evict(self):
+        """Supprime les médias les moins récemment servis jusqu'à repasser sous la limite"""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def flush(self):
+        """Écrit l'ordre LRU courant (arrêt du bot)"""
+        self._save_index()
+
+    def metrics(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+# Instance globale
+media_cache = MediaCache()
@@ -0,0 +1,209 @@
+import heapq
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Bornes de l'intervalle entre deux lectures du flux vidéo d'un même compte (secondes)
+MIN_INTERVAL = float(os.getenv("TIKTOK_MIN_INTERVAL", 180))
+MAX_INTERVAL = float(os.getenv("TIKTOK_MAX_INTERVAL", 3600))
+# Intervalle tant que le rythme de publication n'est pas connu
+DEFAULT_INTERVAL = float(os.getenv("TIKTOK_DEFAULT_INTERVAL", 600))
+# Sonde de live (requête légère) : comptes récemment en live / autres comptes
+LIVE_INTERVAL = float(os.getenv("TIKTOK_LIVE_INTERVAL", 60))
+LIVE_IDLE_INTERVAL = float(os.getenv("TIKTOK_LIVE_IDLE_INTERVAL", 180))
+# Part du débit TikTok (tiktok_rate_limiter) réservée aux sondes de live, le reste allant aux flux vidéo
+LIVE_BUDGET_SHARE = float(os.getenv("TIKTOK_LIVE_BUDGET_SHARE", 0.5))
+# Variation aléatoire (± fraction de l'intervalle) pour étaler la charge
+JITTER = float(os.getenv("TIKTOK_INTERVAL_JITTER", 0.2))
+# Nombre de vérifications visées entre deux publications
+CHECKS_PER_POST = 4
+# Un compte passé en live dans ce délai est sondé à LIVE_INTERVAL
+LIVE_RECENT_SECONDS = 7 * 86400
+# Dates de publication conservées par compte
+POST_HISTORY = 10
+# Disjoncteur : échecs consécutifs avant ouverture, délai maximal entre deux tentatives
+BREAKER_THRESHOLD = int(os.getenv("TIKTOK_BREAKER_THRESHOLD", 3))
+BACKOFF_MAX = float(os.getenv("TIKTOK_BACKOFF_MAX", 6 * 3600))
+
+
+def compute_interval(state: Dict, now: Optional[float] = None) -> float:
+    """Intervalle de lecture du flux vidéo d'un compte d'après son rythme de publication
+
+    Le rythme est l'écart moyen entre les dernières vidéos, en comptant le
+    temps écoulé depuis la plus récente : un compte qui cesse de publier
+    est vérifié de moins en moins souvent.
+    """
+    now = now if now is not None else time.time()
+    posts = state.get("post_times", [])
+    if len(posts) < 2:
+        return DEFAULT_INTERVAL
+    cadence = (now - posts[0]) / len(posts)
+    return min(MAX_INTERVAL, max(MIN_INTERVAL, cadence / CHECKS_PER_POST))
+
+
+def compute_live_interval(
+    state: Dict, now: Optional[float] = None, accounts: int = 1, rate: Optional[float] = None
+) -> float:
+    """Intervalle de la sonde de live : plus court pour les comptes habitués du live
+
+    Avec `accounts` comptes sondés et un débit TikTok de `rate` requêtes/s,
+    l'intervalle est allongé pour que les sondes ne consomment pas plus de
+    LIVE_BUDGET_SHARE du débit : les lectures de flux gardent le reste.
+    """
+    now = now if now is not None else time.time()
+    if state.get("is_live") or now - state.get("last_live_at", 0) < LIVE_RECENT_SECONDS:
+        interval = LIVE_INTERVAL
+    else:
+        interval = LIVE_IDLE_INTERVAL
+    if rate:
+        interval = max(interval, accounts / (rate * LIVE_BUDGET_SHARE))
+    return interval
+
+
+def observe_live(state: Dict, is_live: bool, room_id: Optional[str] = None, now: Optional[float] = None) -> Dict:
+    """Nouvel état d'un compte après une sonde de live"""
+    now = now if now is not None else time.time()
+    state = dict(state)
+    state["is_live"] = is_live
+    state["live_room_id"] = room_id if is_live else None
+    if is_live:
+        state["last_live_at"] = now
+    return state
+
+
+def live_changed(state: Dict, is_live: bool, room_id: Optional[str] = None) -> bool:
+    """Vrai si une sonde révèle un début/fin de live (ou un nouveau live)"""
+    if is_live != state.get("is_live", False):
+        return True
+    return is_live and room_id is not None and room_id != state.get("live_room_id")
+
+
+def observe_feed(state: Dict, info: Dict, now: Optional[float] = None) -> Dict:
+    """Nouvel état d'un compte après lecture de son flux vidéo (dates de publication)
+
+    Le statut de live est suivi par `observe_live` (sonde dédiée, ou flux
+    qui signale un live en cours).
+    """
+    now = now if now is not None else time.time()
+    state = dict(state)
+
+    entries = info.get("entries") or []
+    latest = entries[0] if entries else None
+    if latest and latest.get("id") and latest["id"] != state.get("last_video_id"):
+        posted_at = latest.get("timestamp") or now
+        # Premier passage : la date n'est retenue que si TikTok la fournit
+        if state.get("last_video_id") is not None or latest.get("timestamp"):
+            state["post_times"] = (state.get("post_times", []) + [posted_at])[-POST_HISTORY:]
+        state["last_video_id"] = latest["id"]
+    return state
+
+
+def backoff_delay(failures: int) -> float:
+    """Délai avant la prochaine tentative après `failures` échecs consécutifs (exponentiel)"""
+    return min(BACKOFF_MAX, DEFAULT_INTERVAL * 2 ** max(failures - 1, 0))
+
+
+def record_failure(state: Dict, now: Optional[float] = None) -> Dict:
+    """Nouvel état d'un compte après un flux illisible (compte banni, renommé, privé...)
+
+    Au-delà de BREAKER_THRESHOLD échecs consécutifs le disjoncteur s'ouvre :
+    le compte n'est plus vérifié avant `retry_at`.
+    """
+    now = now if now is not None else time.time()
+    state = dict(state)
+    state["failures"] = state.get("failures", 0) + 1
+    state["last_failure_at"] = now
+    if state["failures"] >= BREAKER_THRESHOLD:
+        state["retry_at"] = now + backoff_delay(state["failures"] - BREAKER_THRESHOLD + 1)
+    return state
+
+
+def record_success(state: Dict) -> Dict:
+    """Nouvel état d'un compte après un flux lu : le disjoncteur se referme"""
+    if not state.get("failures"):
+        return state
+    state = dict(state)
+    for key in ("failures", "last_failure_at", "retry_at"):
+        state.pop(key, None)
+    return state
+
+
+def breaker_status(state: Dict, now: Optional[float] = None) -> str:
+    """État du disjoncteur d'un compte
+
+    - "closed" : compte sain, vérifié à son rythme ;
+    - "open" : trop d'échecs, aucune vérification avant `retry_at` ;
+    - "half_open" : délai écoulé, la prochaine vérification sert de test.
+    """
+    if state.get("failures", 0) < BREAKER_THRESHOLD:
+        return "closed"
+    now = now if now is not None else time.time()
+    return "open" if now < state.get("retry_at", 0) else "half_open"
+
+
+def is_unhealthy(state: Dict) -> bool:
+    """Vrai si le disjoncteur du compte n'est pas fermé"""
+    return breaker_status(state) != "closed"
+
+
+def jittered(interval: float) -> float:
+    return interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+class PollScheduler:
+    """File de priorité des prochaines vérifications (une entrée par compte)
+
+    Les entrées périmées (compte replanifié ou retiré) restent dans le tas
+    et sont ignorées à la sortie : planifier est en O(log n).
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._due: Dict[str, float] = {}
+
+    def __contains__(self, username: str) -> bool:
+        return username in self._due
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def usernames(self) -> List[str]:
+        return list(self._due)
+
+    def schedule(self, username: str, when: float):
+        self._due[username] = when
+        heapq.heappush(self._heap, (when, username))
+
+    def remove(self, username: str):
+        self._due.pop(username, None)
+
+    def first_check(self, username: str, interval: float, when: Optional[float] = None):
+        """Planifie un compte au démarrage ou à sa liaison
+
+        Sans échéance enregistrée, la première vérification est tirée au
+        hasard dans l'intervalle du compte pour éviter une rafale.
+        """
+        if when is None:
+            when = time.time() + random.uniform(0, interval)
+        self.schedule(username, when)
+
+    def next_due(self) -> Optional[float]:
+        while self._heap:
+            when, username = self._heap[0]
+            if self._due.get(username) == when:
+                return when
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Retire et retourne les comptes à vérifier maintenant, avec leur échéance"""
+        now = now if now is not None else time.time()
+        due = []
+        while True:
+            when = self.next_due()
+            if when is None or when > now:
+                return due
+            _, username = heapq.heappop(self._heap)
+            del self._due[username]
+            due.append((username, when))
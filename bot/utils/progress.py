@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import discord
+
+# Délai minimal entre deux modifications du message de progression (secondes)
+PROGRESS_MIN_INTERVAL = float(os.getenv("PROGRESS_MIN_INTERVAL", 2))
+
+
+class ProgressReporter:
+    """Message de progression d'un téléchargement, modifié avec parcimonie
+
+    `update` peut être appelé à chaque morceau reçu, depuis la boucle ou
+    depuis un thread (hook yt-dlp) : les mises à jour sont regroupées et
+    le message n'est modifié qu'au plus une fois par `min_interval`, et
+    seulement si le texte affiché change (pourcentage entier, ou Mo à
+    0,1 près quand la taille est inconnue). Les modifications sont
+    confiées à la boucle via `run_coroutine_threadsafe`.
+    """
+
+    def __init__(
+        self,
+        message: Optional[discord.Message],
+        prefix: str = "",
+        min_interval: Optional[float] = None,
+    ):
+        # Doit être créé depuis la boucle du bot
+        self.loop = asyncio.get_running_loop()
+        self.message = message
+        self.prefix = prefix
+        self.min_interval = PROGRESS_MIN_INTERVAL if min_interval is None else min_interval
+        self._lock = threading.Lock()
+        self._edit_lock = asyncio.Lock()
+        self._pending: Optional[str] = None
+        self._shown: Optional[str] = None
+        self._scheduled = False
+        self._closed = False
+        self._last_edit = 0.0
+        self.updates = 0
+        self.edits = 0
+
+    def format(self, downloaded: int, total: Optional[int]) -> str:
+        if total:
+            return f"{self.prefix}⏳ Téléchargement : {min(int(downloaded / total * 100), 100)}%"
+        return f"{self.prefix}⏳ Téléchargement : {downloaded / 1024 / 1024:.1f} Mo"
+
+    def update(self, downloaded: int, total: Optional[int] = None):
+        """Nouvelle progression (appelable depuis n'importe quel thread)"""
+        text = self.format(downloaded, total)
+        with self._lock:
+            self.updates += 1
+            if self._closed or self.message is None or text in (self._shown, self._pending):
+                return
+            self._pending = text
+            if self._scheduled:
+                return  # La modification déjà planifiée prendra le texte le plus récent
+            self._scheduled = True
+            delay = max(0.0, self._last_edit + self.min_interval - time.monotonic())
+        asyncio.run_coroutine_threadsafe(self._flush(delay), self.loop)
+
+    def ytdlp_hook(self, d: Dict):
+        """Hook de progression yt-dlp"""
+        if d.get("status") == "downloading":
+            self.update(d.get("downloaded_bytes") or 0, d.get("total_bytes") or d.get("total_bytes_estimate"))
+
+    async def _flush(self, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        async with self._edit_lock:
+            with self._lock:
+                text, self._pending = self._pending, None
+                self._scheduled = False
+                if self._closed or text is None or text == self._shown:
+                    return
+                self._last_edit = time.monotonic()
+            try:
+                await self.message.edit(content=text)  # type: ignore
+            except Exception:
+                return  # Message supprimé ou limite de débit : la prochaine mise à jour réessaiera
+            self.edits += 1
+            with self._lock:
+                self._shown = text
+
+    async def finish(self):
+        """Arrête les mises à jour ; attend la modification en cours avant que l'appelant modifie le message"""
+        with self._lock:
+            self._closed = True
+            self._pending = None
+        async with self._edit_lock:
+            pass
@@ -0,0 +1,131 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class RankIndex:
+    """Classement incrémental par compteur (utilisateurs ou vidéos)
+
+    Les clés sont regroupées par compteur ("buckets") et un arbre de
+    Fenwick indexé par compteur donne le nombre de clés sous un seuil :
+    - increment / set : O(log C)
+    - rank            : O(log C), exact quelle que soit la position
+    - top(k)          : O(k + d log C), d = nombre de compteurs distincts parcourus
+    où C est le plus grand compteur. Les ex æquo partagent le même rang ;
+    dans top(), ils sont ordonnés par ordre d'arrivée à ce compteur.
+    """
+
+    def __init__(self, counts: Optional[Dict[str, int]] = None):
+        self._counts: Dict[str, int] = {}
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        self._size = 1024
+        self._tree: List[int] = [0] * (self._size + 1)
+        if counts:
+            for key, count in sorted(counts.items(), key=lambda item: item[1]):
+                self.set(key, count)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._counts
+
+    def count(self, key: str) -> int:
+        return self._counts.get(key, 0)
+
+    def _grow(self, count: int):
+        """Agrandit l'arbre de Fenwick pour accueillir `count`
+
+        Les clés à 0 téléchargement restent hors de l'arbre (comme dans `set`) :
+
+        >>> index = RankIndex({"a": 0, "b": 3})
+        >>> index.set("c", 5000)
+        >>> index.top(3), index.rank("b"), index.rank("a")
+        ([('c', 5000), ('b', 3)], 2, 0)
+        """
+        while self._size < count:
+            self._size *= 2
+        self._tree = [0] * (self._size + 1)
+        for bucket_count, bucket in self._buckets.items():
+            if bucket_count > 0:
+                self._update(bucket_count, len(bucket))
+
+    def _update(self, count: int, delta: int):
+        while count <= self._size:
+            self._tree[count] += delta
+            count += count & -count
+
+    def _prefix(self, count: int) -> int:
+        """Nombre de clés dont le compteur est compris entre 1 et `count`"""
+        count = min(count, self._size)
+        total = 0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def _find(self, position: int) -> int:
+        """Plus petit compteur c tel que _prefix(c) >= position"""
+        index = 0
+        step = self._size
+        while step:
+            nxt = index + step
+            if nxt <= self._size and self._tree[nxt] < position:
+                index = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return index + 1
+
+    def _detach(self, key: str):
+        old = self._counts.pop(key, None)
+        if old is None:
+            return
+        bucket = self._buckets[old]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[old]
+        if old > 0:
+            self._update(old, -1)
+
+    def set(self, key: str, count: int):
+        """Place `key` au compteur `count`"""
+        self._detach(key)
+        self._counts[key] = count
+        self._buckets.setdefault(count, {})[key] = None
+        if count > 0:
+            if count > self._size:
+                self._grow(count)
+            else:
+                self._update(count, 1)
+
+    def increment(self, key: str, by: int = 1):
+        self.set(key, self._counts.get(key, 0) + by)
+
+    def remove(self, key: str):
+        self._detach(key)
+
+    def rank(self, key: str) -> int:
+        """Rang de `key` (1 = premier), 0 si absent ou sans téléchargement"""
+        count = self._counts.get(key, 0)
+        if count <= 0:
+            return 0
+        return self._prefix(self._size) - self._prefix(count) + 1
+
+    def iter_desc(self) -> Iterator[Tuple[str, int]]:
+        """Parcourt les clés par compteur décroissant"""
+        remaining = self._prefix(self._size)
+        while remaining > 0:
+            count = self._find(remaining)
+            bucket = self._buckets[count]
+            for key in bucket:
+                yield key, count
+            remaining -= len(bucket)
+
+    def top(self, limit: int) -> List[Tuple[str, int]]:
+        """Les `limit` premières clés avec leur compteur"""
+        result = []
+        if limit <= 0:
+            return result
+        for item in self.iter_desc():
+            result.append(item)
+            if len(result) >= limit:
+                break
+        return result
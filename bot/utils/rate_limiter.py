@@ -0,0 +1,45 @@
+import os
+import time
+import asyncio
+
+
+class TokenBucket:
+    """Limiteur de débit à seau de jetons (asyncio)
+
+    Le seau se remplit de `rate` jetons par seconde, jusqu'à `capacity`
+    jetons : on autorise de courtes rafales tout en respectant le débit
+    moyen. Les appelants sont servis dans l'ordre d'arrivée.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0:
+            raise ValueError("Le débit doit être strictement positif")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waited = 0.0  # Temps d'attente cumulé (secondes)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1):
+        """Attend qu'un jeton soit disponible puis le consomme"""
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                delay = (tokens - self._tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self._tokens -= tokens
+
+
+# Requêtes vers tiktok.com (toutes fonctionnalités confondues)
+tiktok_rate_limiter = TokenBucket(
+    rate=float(os.getenv("TIKTOK_RATE_PER_SECOND", 1)),
+    capacity=float(os.getenv("TIKTOK_RATE_BURST", 3)),
+)
@@ -0,0 +1,128 @@
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Largeur (secondes) et nombre de tranches conservées par granularité
+GRANULARITIES = {
+    "hour": (3600, int(os.getenv("STATS_ROLLUP_HOURS", 168))),   # 7 jours
+    "day": (86400, int(os.getenv("STATS_ROLLUP_DAYS", 90))),     # ~3 mois
+}
+DIMENSIONS = ("platforms", "users", "videos")
+
+
+def _empty_slot(start: int) -> Dict:
+    return {"start": start, "platforms": {}, "users": {}, "videos": {}}
+
+
+class TimeRollup:
+    """Compteurs de téléchargements par heure et par jour (buffers circulaires)
+
+    Chaque tranche ne stocke que les plateformes, utilisateurs et vidéos
+    actifs pendant sa période. Une requête sur une fenêtre de N tranches
+    ne lit que ces N tranches, jamais l'historique complet.
+
+    Seule la tranche la plus récente de chaque anneau est modifiée en
+    place ; une tranche plus ancienne est copiée avant modification, ce
+    qui permet de partager les tranches closes entre copies (checkpoints).
+    """
+
+    def __init__(self, data: Optional[Dict] = None):
+        self._rings: Dict[str, List[Optional[Dict]]] = {}
+        self._latest: Dict[str, int] = {}
+        for name, (_, size) in GRANULARITIES.items():
+            ring: List[Optional[Dict]] = [None] * size
+            for slot in (data or {}).get(name, []):
+                if slot:
+                    self._store(name, ring, slot)
+            self._rings[name] = ring
+            self._latest[name] = max((slot["start"] for slot in ring if slot), default=-1)
+
+    @staticmethod
+    def _store(name: str, ring: List[Optional[Dict]], slot: Dict):
+        width, size = GRANULARITIES[name]
+        index = (slot["start"] // width) % len(ring)
+        current = ring[index]
+        if current is None or current["start"] < slot["start"]:
+            ring[index] = slot
+
+    def add(self, timestamp: float, platform: str, user_id: str, video_url: str):
+        """Comptabilise un téléchargement dans les tranches horaire et journalière"""
+        for name, ring in self._rings.items():
+            width, _ = GRANULARITIES[name]
+            start = int(timestamp // width) * width
+            index = (start // width) % len(ring)
+            slot = ring[index]
+
+            if slot is None or slot["start"] < start:
+                slot = _empty_slot(start)
+                ring[index] = slot
+            elif slot["start"] > start:
+                continue  # Plus ancien que la fenêtre conservée
+            elif start != self._latest[name]:
+                # Tranche close potentiellement partagée : copie avant modification
+                slot = {key: (dict(value) if isinstance(value, dict) else value) for key, value in slot.items()}
+                ring[index] = slot
+            self._latest[name] = max(self._latest[name], start)
+
+            for dimension, key in (("platforms", platform), ("users", user_id), ("videos", video_url)):
+                counters = slot[dimension]
+                counters[key] = counters.get(key, 0) + 1
+
+    def _window(self, granularity: str, count: int, now: Optional[float]):
+        """Tranches couvrant les `count` dernières périodes (période courante incluse)"""
+        width, size = GRANULARITIES[granularity]
+        ring = self._rings[granularity]
+        current = int((now if now is not None else time.time()) // width) * width
+        for i in range(min(count, size)):
+            start = current - i * width
+            slot = ring[(start // width) % size]
+            if slot is not None and slot["start"] == start:
+                yield slot
+
+    def window_total(
+        self,
+        dimension: str = "platforms",
+        key: Optional[str] = None,
+        granularity: str = "day",
+        count: int = 7,
+        now: Optional[float] = None,
+    ) -> int:
+        """Téléchargements sur la fenêtre, pour une clé ou pour toute la dimension"""
+        total = 0
+        for slot in self._window(granularity, count, now):
+            counters = slot[dimension]
+            total += counters.get(key, 0) if key is not None else sum(counters.values())
+        return total
+
+    def window_top(
+        self,
+        dimension: str,
+        limit: int = 10,
+        granularity: str = "day",
+        count: int = 7,
+        now: Optional[float] = None,
+    ) -> List[Tuple[str, int]]:
+        """Clés les plus actives sur la fenêtre"""
+        merged: Dict[str, int] = {}
+        for slot in self._window(granularity, count, now):
+            for key, value in slot[dimension].items():
+                merged[key] = merged.get(key, 0) + value
+        return sorted(merged.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def copy(self) -> "TimeRollup":
+        """Copie indépendante ; seules les tranches ouvertes sont dupliquées"""
+        clone = TimeRollup.__new__(TimeRollup)
+        clone._rings = {}
+        clone._latest = dict(self._latest)
+        for name, ring in self._rings.items():
+            clone._rings[name] = [
+                {key: (dict(value) if isinstance(value, dict) else value) for key, value in slot.items()}
+                if slot is not None and slot["start"] == self._latest[name]
+                else slot
+                for slot in ring
+            ]
+        return clone
+
+    def to_dict(self) -> Dict:
+        """Forme sérialisable (tranches non vides uniquement)"""
+        return {name: [slot for slot in ring if slot] for name, ring in self._rings.items()}
@@ -0,0 +1,62 @@
+from typing import Dict, List, Optional, Protocol, Tuple, runtime_checkable
+
+from utils.stats_snapshot import StatsSnapshot
+
+# Backends disponibles pour STATS_BACKEND :
+# - "json"   : StatsManager (stats.json + journal d'événements)
+# - "sqlite" : SQLiteStatsManager (base SQLite en mode WAL)
+# - "memory" : MemoryStatsManager (aucune persistance, pour les tests et benchmarks)
+BACKENDS = ("json", "sqlite", "memory")
+
+
+@runtime_checkable
+class StatsBackend(Protocol):
+    """API commune des gestionnaires de statistiques
+
+    Les commandes et le serveur ne dépendent que de ces méthodes ; le
+    backend concret est choisi par `create_stats_manager`. Les écritures
+    peuvent être différées : `checkpoint` garantit que les lectures
+    voient tous les téléchargements enregistrés.
+    """
+
+    async def record_download(self, user_id: int, user_name: str, platform: str, video_url: str, video_title: str = "Vidéo sans titre"):
+        ...
+
+    async def snapshot(self) -> StatsSnapshot:
+        ...
+
+    async def get_user_stats(self, user_id: int) -> Dict:
+        ...
+
+    async def get_user_rank(self, user_id: int) -> int:
+        ...
+
+    async def get_top_users(self, limit: int = 10) -> List[Tuple[str, Dict]]:
+        ...
+
+    async def get_top_videos(self, limit: int = 10) -> List[Tuple[str, Dict]]:
+        ...
+
+    async def get_video_stats(self, video_url: str) -> Optional[Dict]:
+        ...
+
+    async def get_global_stats(self) -> Dict:
+        ...
+
+    async def get_window_total(self, dimension: str = "platforms", key: Optional[str] = None, granularity: str = "day", count: int = 7) -> int:
+        ...
+
+    async def get_window_top(self, dimension: str, limit: int = 10, granularity: str = "day", count: int = 7) -> List[Tuple[str, int]]:
+        ...
+
+    async def get_trending_videos(self, limit: int = 5, platform: Optional[str] = None) -> List[Tuple[str, Dict, float]]:
+        ...
+
+    async def checkpoint(self):
+        ...
+
+    async def close(self):
+        ...
+
+    def get_writer_metrics(self) -> Dict:
+        ...
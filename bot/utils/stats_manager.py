@@ -1,96 +1,332 @@
 import json
+import math
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 import asyncio
 
+from utils.atomic_io import write_json_atomic
+from utils.rank_index import RankIndex
+from utils.rollups import TimeRollup
+from utils.stats_backend import BACKENDS, StatsBackend
+from utils.stats_snapshot import StatsSnapshot
+from utils.trending import TrendingIndex
+from utils.unique_users import UniqueUsers
+from utils.video_archive import VideoArchive
+from utils.write_behind import WriteBehindQueue
+
+# Modes de stockage disponibles :
+# - "json"     : réécriture complète de stats.json à chaque téléchargement (historique)
+# - "eventlog" : une ligne compacte ajoutée au journal par téléchargement,
+#                agrégats en mémoire et checkpoints périodiques dans stats.json
+STORAGE_MODES = ("json", "eventlog")
+
+# Archivage des vidéos froides hors de la mémoire (lors des checkpoints) :
+# - "idle" : vidéos sans téléchargement depuis STATS_ARCHIVE_AFTER_DAYS jours
+# - "lru"  : au plus STATS_MAX_HOT_VIDEOS vidéos en mémoire, les moins récentes sortent
+# - "none" : toutes les vidéos restent en mémoire
+# Les STATS_ARCHIVE_KEEP_TOP vidéos les plus téléchargées et les tops tendance
+# ne sont jamais archivés.
+ARCHIVE_POLICIES = ("none", "idle", "lru")
+
+
+def _default_stats() -> Dict:
+    """Structure par défaut du fichier de stats"""
+    return {
+        "users": {},
+        "videos": {},
+        "platforms": {
+            "instagram": 0,
+            "pinterest": 0
+        },
+        "total_downloads": 0,
+        "last_updated": datetime.now().isoformat()
+    }
+
+
 class StatsManager:
-    def __init__(self, stats_file: Optional[str] = None):
+    def __init__(
+        self,
+        stats_file: Optional[str] = None,
+        storage_mode: Optional[str] = None,
+        checkpoint_every: Optional[int] = None,
+        archive_policy: Optional[str] = None,
+    ):
         # Utiliser un chemin absolu basé sur l'emplacement du fichier
         if stats_file is None:
             # Obtenir le dossier du bot (parent du dossier utils)
             bot_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             stats_file = os.path.join(bot_dir, "data", "stats.json")
-        
+
         self.stats_file = stats_file
-        self.lock = asyncio.Lock()
-        print(f"📊 StatsManager initialisé avec le fichier : {self.stats_file}")
+        self.log_file = os.path.splitext(stats_file)[0] + ".log"
+        self.storage_mode = storage_mode or os.getenv("STATS_STORAGE_MODE", "eventlog")
+        if self.storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Mode de stockage inconnu : {self.storage_mode}")
+        self.checkpoint_every = checkpoint_every or int(os.getenv("STATS_CHECKPOINT_EVERY", 500))
+        self.archive_policy = archive_policy or os.getenv("STATS_ARCHIVE_POLICY", "idle")
+        if self.archive_policy not in ARCHIVE_POLICIES:
+            raise ValueError(f"Politique d'archivage inconnue : {self.archive_policy}")
+        self.archive_after_days = float(os.getenv("STATS_ARCHIVE_AFTER_DAYS", 30))
+        self.max_hot_videos = int(os.getenv("STATS_MAX_HOT_VIDEOS", 10000))
+        self.archive_keep_top = int(os.getenv("STATS_ARCHIVE_KEEP_TOP", 100))
+        self.archive_base = os.path.splitext(stats_file)[0] + "_archive"
+        self._log_handle = None
+        self._seq = 0
+        self._events_since_checkpoint = 0
+        self._checkpoint_due = False
+        self._writer = WriteBehindQueue(self._flush, name="stats")
+        # Version des agrégats, incrémentée à chaque écriture
+        self._version = 0
+        self._snapshot: Optional[StatsSnapshot] = None
+        # Utilisateurs distincts par vidéo, décodés à la première modification
+        self._downloaders: Dict[str, UniqueUsers] = {}
+        self._dirty_downloaders: set = set()
+        self._trending = TrendingIndex()
+        # Vidéos chaudes de la moins à la plus récemment téléchargée
+        self._recency: "OrderedDict[str, float]" = OrderedDict()
+        # Fiches retirées de la mémoire mais pas encore écrites dans l'archive
+        self._archiving: Dict[str, Dict] = {}
+        self.data = self._open_storage()
+        self._rebuild_indexes()
+
+    def _open_storage(self) -> Dict:
+        """Prépare les fichiers de stats et charge les agrégats"""
+        print(f"📊 StatsManager initialisé avec le fichier : {self.stats_file} (mode {self.storage_mode})")
         self._ensure_data_directory()
         self._ensure_stats_file()
-    
+        return self._load_from_disk()
+
     def _ensure_data_directory(self):
         """Crée le dossier data s'il n'existe pas"""
         data_dir = os.path.dirname(self.stats_file)
         if data_dir and not os.path.exists(data_dir):
             os.makedirs(data_dir)
             print(f"📁 Dossier de données créé : {data_dir}")
-    
+
     def _ensure_stats_file(self):
         """Crée le fichier de stats s'il n'existe pas"""
         if not os.path.exists(self.stats_file):
-            default_data = {
-                "users": {},
-                "videos": {},
-                "platforms": {
-                    "instagram": 0,
-                    "pinterest": 0
-                },
-                "total_downloads": 0,
-                "last_updated": datetime.now().isoformat()
-            }
             try:
-                with open(self.stats_file, "w", encoding="utf-8") as f:
-                    json.dump(default_data, f, indent=4, ensure_ascii=False)
+                write_json_atomic(self.stats_file, _default_stats(), indent=4)
                 print(f"✅ Fichier de stats créé : {self.stats_file}")
             except Exception as e:
                 print(f"❌ Erreur lors de la création du fichier stats : {e}")
         else:
             print(f"✅ Fichier de stats existant trouvé : {self.stats_file}")
-    
-    async def load_stats(self) -> Dict:
-        """Charge les statistiques depuis le fichier"""
-        async with self.lock:
-            try:
-                if not os.path.exists(self.stats_file):
-                    print(f"⚠️ Fichier stats non trouvé, création d'un nouveau fichier")
-                    self._ensure_stats_file()
-                
-                with open(self.stats_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    print(f"📖 Stats chargées : {len(data.get('users', {}))} utilisateurs, {len(data.get('videos', {}))} vidéos")
-                    return data
-            except Exception as e:
-                print(f"⚠️ Erreur lors du chargement des stats: {e}")
-                # Retourner une structure par défaut en cas d'erreur
-                return {
-                    "users": {},
-                    "videos": {},
-                    "platforms": {"instagram": 0, "pinterest": 0},
-                    "total_downloads": 0,
-                    "last_updated": datetime.now().isoformat()
-                }
-    
-    async def save_stats(self, data: Dict):
-        """Sauvegarde les statistiques dans le fichier"""
-        async with self.lock:
-            try:
-                data["last_updated"] = datetime.now().isoformat()
-                with open(self.stats_file, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=4, ensure_ascii=False)
-                print(f"💾 Stats sauvegardées : {data.get('total_downloads', 0)} téléchargements totaux")
-            except Exception as e:
-                print(f"⚠️ Erreur lors de la sauvegarde des stats: {e}")
-    
-    async def record_download(self, user_id: int, user_name: str, platform: str, video_url: str, video_title: str = "Vidéo sans titre"):
-        """Enregistre un téléchargement"""
-        stats = await self.load_stats()
-        
-        print(f"📊 Enregistrement du téléchargement : user={user_name}, platform={platform}")
-        
+
+    def _load_from_disk(self) -> Dict:
+        """Charge le dernier checkpoint puis rejoue la fin du journal"""
+        data, replayed = self._read_from_disk()
+
+        compact = self._archive.needs_compaction()
+        if compact:
+            self._archive.compact()
+        if compact or (replayed and self.storage_mode == "json"):
+            # Passage du mode eventlog au mode json, ou nouveau segment d'archive :
+            # on écrit tout de suite un checkpoint qui reflète l'état chargé
+            self.data = data
+            self._write_checkpoint(self._document())
+            self._archive.remove_stale()
+        else:
+            self._events_since_checkpoint = replayed
+        return data
+
+    def _read_from_disk(self) -> Tuple[Dict, int]:
+        """Lit le checkpoint et la fin du journal sans rien écrire
+
+        Retourne les agrégats et le nombre d'événements rejoués.
+        """
+        try:
+            with open(self.stats_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Erreur lors du chargement des stats: {e}")
+            data = _default_stats()
+
+        self._upgrade_videos(data)
+        self._seed_trending(data)
+        # Les tranches horaires/journalières vivent dans TimeRollup, pas dans data
+        self._rollup = TimeRollup(data.pop("rollups", None))
+        self._archive = VideoArchive(self.archive_base, data.pop("archive", None))
+        self._seq = data.get("last_seq", 0)
+        replayed = self._replay_log(data)
+        print(
+            f"📖 Stats chargées : {len(data.get('users', {}))} utilisateurs, {len(data.get('videos', {}))} vidéos "
+            f"(+{len(self._archive)} archivées, {replayed} événements rejoués)"
+        )
+        return data, replayed
+
+    def _replay_log(self, data: Dict) -> int:
+        """Applique les événements du journal postérieurs au dernier checkpoint"""
+        if not os.path.exists(self.log_file):
+            return 0
+
+        replayed = 0
+        with open(self.log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # Dernière ligne tronquée par un arrêt brutal
+                    print(f"⚠️ Ligne de journal illisible ignorée : {line[:80]}")
+                    continue
+                if event["s"] <= self._seq:
+                    continue  # Déjà incluse dans le checkpoint (ou ligne dupliquée)
+                self._apply_event(data, event)
+                self._seq = max(self._seq, event["s"])
+                replayed += 1
+        return replayed
+
+    @staticmethod
+    def _upgrade_videos(data: Dict):
+        """Convertit les anciennes listes downloaded_by au format compact"""
+        upgraded = 0
+        videos = data["videos"]
+        for url, video in videos.items():
+            if "downloaded_by" not in video:
+                continue
+            downloaders = UniqueUsers.from_ids(video["downloaded_by"])
+            record = dict(video)
+            del record["downloaded_by"]
+            record["unique_users"] = len(downloaders)
+            record["downloaders"] = downloaders.encode()
+            videos[url] = record
+            upgraded += 1
+        if upgraded:
+            print(f"🗜️ {upgraded} listes downloaded_by converties au format compact")
+
+    def _seed_trending(self, data: Dict):
+        """Charge les clés de tendance des vidéos dans l'index"""
+        self._trending = TrendingIndex()
+        for url, video in data["videos"].items():
+            key = video.get("trend")
+            if key is None and video.get("first_download"):
+                # Fiche antérieure au score : téléchargements supposés à la date du premier
+                first = datetime.fromisoformat(video["first_download"]).timestamp()
+                key = math.log(max(video.get("downloads", 1), 1)) + self._trending.event_key(first)
+                video["trend"] = key
+            if key is not None:
+                self._trending.set(url, video.get("platform", "inconnu"), key)
+
+    def _video_downloaders(self, video_url: str, record: Optional[Dict]) -> UniqueUsers:
+        """Ensemble des utilisateurs distincts d'une vidéo (décodé à la demande)"""
+        downloaders = self._downloaders.get(video_url)
+        if downloaders is None:
+            encoded = record.get("downloaders", "") if record else ""
+            downloaders = UniqueUsers.decode(encoded)
+            self._downloaders[video_url] = downloaders
+        return downloaders
+
+    def _rebuild_indexes(self):
+        """Reconstruit les classements à partir des agrégats"""
+        self._user_ranks = RankIndex({uid: u["downloads"] for uid, u in self.data["users"].items()})
+        self._video_ranks = RankIndex({url: v["downloads"] for url, v in self.data["videos"].items()})
+        self._recency = OrderedDict(sorted(
+            ((url, self._last_download_ts(v)) for url, v in self.data["videos"].items()),
+            key=lambda item: item[1],
+        ))
+
+    @staticmethod
+    def _last_download_ts(video: Dict) -> float:
+        last = video.get("last_download") or video.get("first_download")
+        return datetime.fromisoformat(last).timestamp() if last else 0.0
+
+    def _unarchive(self, video_url: str) -> Optional[Dict]:
+        """Retire une vidéo de l'archive pour la remettre en mémoire"""
+        record = self._archiving.pop(video_url, None)
+        if record is None:
+            if video_url not in self._archive:
+                return None
+            record = self._archive.read(video_url)
+            self._archive.discard(video_url)
+        if record.get("trend") is not None:
+            self._trending.set(video_url, record.get("platform", "inconnu"), record["trend"])
+        return record
+
+    def _select_cold(self) -> List[str]:
+        """Vidéos à archiver selon la politique, des moins récentes aux plus récentes"""
+        if self.archive_policy == "none":
+            return []
+        if self.archive_policy == "lru":
+            excess = len(self.data["videos"]) - self.max_hot_videos
+            if excess <= 0:
+                return []
+            cutoff = math.inf
+        else:
+            excess = len(self._recency)
+            cutoff = time.time() - self.archive_after_days * 86400
+
+        protected = {url for url, _ in self._video_ranks.top(self.archive_keep_top)}
+        protected.update(url for url, _ in self._trending.top(None, limit=len(self._recency)))
+        cold = []
+        for url, last in self._recency.items():
+            if len(cold) >= excess or last >= cutoff:
+                break
+            if url not in protected:
+                cold.append(url)
+        return cold
+
+    def _evict(self, urls: List[str]) -> Dict[str, Dict]:
+        """Sort des vidéos de la mémoire ; retourne leurs fiches à écrire dans l'archive
+
+        Une vidéo hors du top-K (téléchargements et tendance) ne peut y
+        revenir qu'en étant téléchargée, ce qui la ramène en mémoire : les
+        classements restent exacts sans elle.
+        """
+        videos = self.data["videos"]
+        records = {}
+        for url in urls:
+            record = videos.pop(url)
+            if url in self._dirty_downloaders:
+                record = dict(record)
+                record["downloaders"] = self._downloaders[url].encode()
+                self._dirty_downloaders.discard(url)
+            self._downloaders.pop(url, None)
+            self._video_ranks.remove(url)
+            self._trending.remove(url)
+            del self._recency[url]
+            records[url] = record
+        if records:
+            self._archiving.update(records)
+            self._version += 1
+        return records
+
+    def _restore_evicted(self, records: Dict[str, Dict]):
+        """Remet en mémoire des fiches dont l'archivage a échoué"""
+        for url, record in records.items():
+            if self._archiving.pop(url, None) is None:
+                continue  # Déjà ramenée en mémoire par un téléchargement
+            self.data["videos"][url] = record
+            self._video_ranks.set(url, record["downloads"])
+            if record.get("trend") is not None:
+                self._trending.set(url, record.get("platform", "inconnu"), record["trend"])
+            self._recency[url] = self._last_download_ts(record)
+        if records:
+            self._version += 1
+
+    def _apply_event(self, stats: Dict, event: Dict):
+        """Applique un événement de téléchargement aux agrégats
+
+        Les fiches utilisateur et vidéo sont remplacées (copy-on-write) et
+        jamais modifiées en place, pour que les copies passées à l'écriture
+        en tâche de fond restent cohérentes.
+        """
+        user_id_str = event["u"]
+        user_name = event["n"]
+        platform = event["p"]
+        video_url = event["v"]
+        timestamp = datetime.fromtimestamp(event["t"]).isoformat()
+
         # Mise à jour des stats utilisateur
-        user_id_str = str(user_id)
-        if user_id_str not in stats["users"]:
-            stats["users"][user_id_str] = {
+        previous_user = stats["users"].get(user_id_str)
+        if previous_user is None:
+            user = {
                 "name": user_name,
                 "downloads": 0,
                 "platforms": {
@@ -99,97 +335,361 @@ class StatsManager:
                 },
                 "last_download": None
             }
-        
-        stats["users"][user_id_str]["downloads"] += 1
-        stats["users"][user_id_str]["name"] = user_name  # Met à jour le nom si changé
-        stats["users"][user_id_str]["platforms"][platform] = stats["users"][user_id_str]["platforms"].get(platform, 0) + 1
-        stats["users"][user_id_str]["last_download"] = datetime.now().isoformat()
-        
+        else:
+            user = dict(previous_user)
+            user["platforms"] = dict(previous_user["platforms"])
+
+        user["downloads"] += 1
+        user["name"] = user_name  # Met à jour le nom si changé
+        user["platforms"][platform] = user["platforms"].get(platform, 0) + 1
+        user["last_download"] = timestamp
+        stats["users"][user_id_str] = user
+
         # Mise à jour des stats vidéos
-        if video_url not in stats["videos"]:
-            stats["videos"][video_url] = {
-                "title": video_title,
+        previous_video = stats["videos"].get(video_url)
+        if previous_video is None:
+            previous_video = self._unarchive(video_url)
+        if previous_video is None:
+            video = {
+                "title": event["ti"],
                 "platform": platform,
                 "downloads": 0,
-                "first_download": datetime.now().isoformat(),
-                "downloaded_by": []
+                "first_download": timestamp,
+                "unique_users": 0,
+                "downloaders": ""
             }
-        
-        stats["videos"][video_url]["downloads"] += 1
-        if user_id_str not in stats["videos"][video_url]["downloaded_by"]:
-            stats["videos"][video_url]["downloaded_by"].append(user_id_str)
-        
+        else:
+            video = dict(previous_video)
+
+        video["downloads"] += 1
+        video["last_download"] = timestamp
+        video["trend"] = self._trending.add(video_url, platform, event["t"])
+        downloaders = self._video_downloaders(video_url, previous_video)
+        if downloaders.add(user_id_str):
+            video["unique_users"] = len(downloaders)
+            self._dirty_downloaders.add(video_url)
+        stats["videos"][video_url] = video
+        self._recency[video_url] = event["t"]
+        self._recency.move_to_end(video_url)
+
         # Mise à jour des stats plateformes
         stats["platforms"][platform] = stats["platforms"].get(platform, 0) + 1
-        
+
         # Mise à jour du total
         stats["total_downloads"] += 1
-        
-        await self.save_stats(stats)
-    
+
+        # Compteurs par heure et par jour
+        self._rollup.add(event["t"], platform, user_id_str, video_url)
+
+    def _append_events(self, events: List[Dict]):
+        """Ajoute une ligne compacte par téléchargement au journal"""
+        if self._log_handle is None:
+            self._log_handle = open(self.log_file, "a", encoding="utf-8")
+        self._log_handle.write("".join(
+            json.dumps(event, separators=(",", ":"), ensure_ascii=False) + "\n"
+            for event in events
+        ))
+        self._log_handle.flush()
+        os.fsync(self._log_handle.fileno())
+
+    def _document(self) -> Dict:
+        """Copie cohérente des agrégats, sérialisable hors de l'event loop
+
+        Grâce au copy-on-write des fiches, copier les dictionnaires de
+        premier niveau suffit (copie en C, quelques millisecondes). Seuls
+        les ensembles d'utilisateurs modifiés depuis le dernier checkpoint
+        sont réencodés.
+        """
+        videos = self.data["videos"]
+        for url in self._dirty_downloaders:
+            if url in videos:
+                record = dict(videos[url])
+                record["downloaders"] = self._downloaders[url].encode()
+                videos[url] = record
+        self._dirty_downloaders.clear()
+
+        doc = dict(self.data)
+        doc["users"] = dict(self.data["users"])
+        doc["videos"] = dict(self.data["videos"])
+        doc["platforms"] = dict(self.data["platforms"])
+        doc["rollups"] = self._rollup.copy().to_dict()
+        doc["archive"] = self._archive.to_dict()
+        doc["last_seq"] = self._seq
+        doc["last_updated"] = datetime.now().isoformat()
+        return doc
+
+    def export_stats(self) -> Dict:
+        """Agrégats au format stats.json (rollups, utilisateurs distincts et vidéos archivées inclus)"""
+        doc = self._document()
+        archive = doc.pop("archive")["index"]
+        videos = dict(self._archive.records(archive))
+        videos.update(self._archiving)
+        videos.update(doc["videos"])
+        doc["videos"] = videos
+        return doc
+
+    def _write_checkpoint(self, doc: Dict):
+        """Replie le journal dans stats.json puis le vide"""
+        write_json_atomic(self.stats_file, doc, indent=4)
+
+        # Le snapshot est sur disque : le journal peut être vidé. Un crash
+        # entre les deux étapes est sans conséquence grâce à "last_seq".
+        if self._log_handle is not None:
+            self._log_handle.close()
+            self._log_handle = None
+        if os.path.exists(self.log_file):
+            open(self.log_file, "w", encoding="utf-8").close()
+        print(f"💾 Stats sauvegardées : {doc.get('total_downloads', 0)} téléchargements totaux")
+
+    def _archive_and_checkpoint(self, doc: Dict, evicted: Dict[str, Dict]) -> Dict[str, List[int]]:
+        """Écrit les fiches archivées puis le checkpoint qui les référence"""
+        entries = self._archive.append(evicted)
+        doc["archive"]["index"].update(entries)
+        self._write_checkpoint(doc)
+        return entries
+
+    def _persist(self, events: List[Dict], doc: Optional[Dict], evicted: Dict[str, Dict]) -> Tuple[bool, Dict[str, List[int]]]:
+        """Écrit un lot sur disque (exécuté dans un thread)
+
+        Retourne (checkpoint écrit, entrées d'index des fiches archivées).
+        """
+        if self.storage_mode == "eventlog":
+            if events:
+                self._append_events(events)
+            if doc is None:
+                return False, {}
+            try:
+                return True, self._archive_and_checkpoint(doc, evicted)
+            except Exception as e:
+                # Les événements sont déjà dans le journal : on réessaiera au prochain lot
+                print(f"⚠️ Erreur lors du checkpoint des stats: {e}")
+                return False, {}
+
+        # Mode json : le snapshot est la seule copie, une erreur doit remonter
+        return True, self._archive_and_checkpoint(doc, evicted)
+
+    async def _flush(self, events: List[Dict]):
+        """Callback de la file d'écriture différée"""
+        checkpoint = (
+            self.storage_mode == "json"
+            or self._checkpoint_due
+            or self._events_since_checkpoint + len(events) >= self.checkpoint_every
+        )
+        evicted: Dict[str, Dict] = {}
+        doc = None
+        if checkpoint:
+            evicted = self._evict(self._select_cold())
+            doc = self._document()
+        try:
+            written, entries = await asyncio.to_thread(self._persist, events, doc, evicted)
+        except Exception:
+            self._restore_evicted(evicted)
+            raise
+
+        if written:
+            # Les vidéos retéléchargées pendant l'écriture sont déjà revenues en mémoire
+            self._archive.add_entries({url: entry for url, entry in entries.items() if url in self._archiving})
+            self._archiving.clear()
+            if evicted:
+                print(f"🗄️ {len(evicted)} vidéos froides archivées ({len(self._archive)} au total)")
+        else:
+            self._restore_evicted(evicted)
+
+        if written:
+            self._events_since_checkpoint = 0
+            self._checkpoint_due = False
+        else:
+            self._events_since_checkpoint += len(events)
+            self._checkpoint_due = checkpoint
+
+    async def load_stats(self) -> Dict:
+        """Retourne les agrégats en mémoire (ne relit pas le fichier)"""
+        return self.data
+
+    async def save_stats(self, data: Dict):
+        """Remplace les agrégats et les sauvegarde immédiatement"""
+        self._upgrade_videos(data)
+        self._seed_trending(data)
+        self._rollup = TimeRollup(data.pop("rollups", None))
+        if "archive" in data:
+            self._archive = VideoArchive(self.archive_base, data.pop("archive"))
+        for url in data["videos"]:
+            self._archive.discard(url)
+        self.data = data
+        self._downloaders = {}
+        self._dirty_downloaders = set()
+        self._rebuild_indexes()
+        self._version += 1
+        self._checkpoint_due = True
+        await self._writer.flush()
+
+    async def checkpoint(self):
+        """Force un checkpoint s'il reste des événements non repliés"""
+        if self._events_since_checkpoint or self._writer.queue_depth:
+            self._checkpoint_due = True
+            await self._writer.flush()
+
+    async def close(self):
+        """Vide la file d'écriture et replie le journal (arrêt du bot)"""
+        await self._writer.close()
+        await self.checkpoint()
+        if self._log_handle is not None:
+            self._log_handle.close()
+            self._log_handle = None
+
+    def get_writer_metrics(self) -> Dict:
+        """Profondeur de la file d'écriture et latence des flush"""
+        return self._writer.metrics()
+
+    async def record_download(self, user_id: int, user_name: str, platform: str, video_url: str, video_title: str = "Vidéo sans titre"):
+        """Enregistre un téléchargement (O(1) : l'écriture disque est différée)"""
+        print(f"📊 Enregistrement du téléchargement : user={user_name}, platform={platform}")
+
+        self._seq += 1
+        event = {
+            "s": self._seq,
+            "t": time.time(),
+            "u": str(user_id),
+            "n": user_name,
+            "p": platform,
+            "v": video_url,
+            "ti": video_title
+        }
+        self._apply_event(self.data, event)
+        self._user_ranks.increment(event["u"])
+        self._video_ranks.set(video_url, self.data["videos"][video_url]["downloads"])
+        self._version += 1
+        self._writer.enqueue(event)
+
+    async def snapshot(self) -> StatsSnapshot:
+        """Vue versionnée des agrégats, partagée jusqu'à la prochaine écriture
+
+        O(1) : le snapshot ne copie rien. Ses résultats sont calculés à la
+        première lecture et abandonnés dès que la version change.
+        """
+        if self._snapshot is None or self._snapshot.version != self._version:
+            self._snapshot = StatsSnapshot(self._version, self)
+        return self._snapshot
+
     async def get_user_stats(self, user_id: int) -> Dict:
         """Récupère les statistiques d'un utilisateur"""
-        stats = await self.load_stats()
         user_id_str = str(user_id)
-        
-        if user_id_str not in stats["users"]:
+
+        if user_id_str not in self.data["users"]:
             return {
                 "downloads": 0,
                 "platforms": {"instagram": 0, "pinterest": 0},
                 "last_download": None
             }
-        
-        return stats["users"][user_id_str]
-    
+
+        return self.data["users"][user_id_str]
+
     async def get_top_users(self, limit: int = 10) -> List[Tuple[str, Dict]]:
         """Récupère le classement des utilisateurs les plus actifs"""
-        stats = await self.load_stats()
-        users = stats["users"]
-        
-        # Trie par nombre de téléchargements
-        sorted_users = sorted(
-            users.items(),
-            key=lambda x: x[1]["downloads"],
-            reverse=True
-        )
-        
-        return sorted_users[:limit]
-    
+        users = self.data["users"]
+        return [(uid, users[uid]) for uid, _ in self._user_ranks.top(limit)]
+
     async def get_top_videos(self, limit: int = 10) -> List[Tuple[str, Dict]]:
         """Récupère les vidéos les plus téléchargées"""
-        stats = await self.load_stats()
-        videos = stats["videos"]
-        
-        # Trie par nombre de téléchargements
-        sorted_videos = sorted(
-            videos.items(),
-            key=lambda x: x[1]["downloads"],
-            reverse=True
-        )
-        
-        return sorted_videos[:limit]
-    
+        videos = self.data["videos"]
+        return [(url, videos[url]) for url, _ in self._video_ranks.top(limit)]
+
     async def get_global_stats(self) -> Dict:
         """Récupère les statistiques globales"""
-        stats = await self.load_stats()
-        
+        stats = self.data
+
         return {
             "total_downloads": stats["total_downloads"],
             "total_users": len(stats["users"]),
-            "total_videos": len(stats["videos"]),
-            "platforms": stats["platforms"]
+            "total_videos": len(stats["videos"]) + len(self._archive) + len(self._archiving),
+            "platforms": dict(stats["platforms"])
         }
-    
+
+    async def get_video_stats(self, video_url: str) -> Optional[Dict]:
+        """Fiche d'une vidéo, relue depuis l'archive si elle est froide"""
+        video = self.data["videos"].get(video_url) or self._archiving.get(video_url)
+        if video is None and video_url in self._archive:
+            video = await asyncio.to_thread(self._archive.read, video_url)
+        return video
+
+    async def get_window_total(self, dimension: str = "platforms", key: Optional[str] = None, granularity: str = "day", count: int = 7) -> int:
+        """Téléchargements sur les `count` dernières heures/jours"""
+        return self._rollup.window_total(dimension, key, granularity, count)
+
+    async def get_window_top(self, dimension: str, limit: int = 10, granularity: str = "day", count: int = 7) -> List[Tuple[str, int]]:
+        """Utilisateurs/vidéos/plateformes les plus actifs sur la fenêtre"""
+        return self._rollup.window_top(dimension, limit, granularity, count)
+
+    async def get_trending_videos(self, limit: int = 5, platform: Optional[str] = None) -> List[Tuple[str, Dict, float]]:
+        """Vidéos tendance (score à décroissance exponentielle), en O(K)"""
+        videos = self.data["videos"]
+        return [(url, videos[url], score) for url, score in self._trending.top(platform, limit)]
+
     async def get_user_rank(self, user_id: int) -> int:
-        """Récupère le classement d'un utilisateur"""
-        top_users = await self.get_top_users(limit=1000)  # Récupère tous les utilisateurs
-        
-        user_id_str = str(user_id)
-        for rank, (uid, _) in enumerate(top_users, start=1):
-            if uid == user_id_str:
-                return rank
-        
-        return 0  # Utilisateur pas dans le classement
-
-# Instance globale
-stats_manager = StatsManager()
+        """Récupère le classement d'un utilisateur (0 s'il n'est pas classé)"""
+        return self._user_ranks.rank(str(user_id))
+
+
+class MemoryStatsManager(StatsManager):
+    """Stats en mémoire uniquement : rien n'est lu ni écrit sur disque
+
+    Même logique d'agrégation que StatsManager ; sert de référence pour
+    les tests de conformité et de borne basse pour les benchmarks.
+    """
+
+    def __init__(self):
+        super().__init__(archive_policy="none")
+
+    def _open_storage(self) -> Dict:
+        print("📊 StatsManager initialisé en mémoire (aucune persistance)")
+        self._rollup = TimeRollup()
+        self._archive = VideoArchive(self.archive_base)
+        return _default_stats()
+
+    async def _flush(self, events: List[Dict]):
+        pass
+
+
+class ReadOnlyStatsManager(StatsManager):
+    """Stats relues depuis stats.json et son journal, sans rien modifier sur disque
+
+    Même relecture que StatsManager (checkpoint puis fin du journal) mais
+    ni création de fichier, ni checkpoint, ni compaction de l'archive :
+    sert de source aux migrations.
+    """
+
+    def __init__(self, stats_file: str):
+        super().__init__(stats_file, archive_policy="none")
+
+    def _open_storage(self) -> Dict:
+        print(f"📊 Lecture seule des stats : {self.stats_file}")
+        data, _ = self._read_from_disk()
+        return data
+
+    async def _flush(self, events: List[Dict]):
+        pass
+
+
+def create_stats_manager(backend: Optional[str] = None) -> StatsBackend:
+    """Instancie le backend de stats choisi par STATS_BACKEND ("json", "sqlite" ou "memory")"""
+    backend = backend or os.getenv("STATS_BACKEND", "json")
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de stats inconnu : {backend}")
+    if backend == "sqlite":
+        from utils.stats_sqlite import SQLiteStatsManager
+        return SQLiteStatsManager()
+    if backend == "memory":
+        return MemoryStatsManager()
+    return StatsManager()
+
+
+def __getattr__(name: str):
+    """Instance globale `stats_manager`, créée au premier accès
+
+    Importer les classes de ce module (migration, benchmarks) n'ouvre
+    ainsi aucun fichier de stats.
+    """
+    if name == "stats_manager":
+        instance = globals()["stats_manager"] = create_stats_manager()
+        return instance
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
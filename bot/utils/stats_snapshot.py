@@ -0,0 +1,78 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class StatsSnapshot:
+    """Vue versionnée des agrégats de stats
+
+    Prendre un snapshot est en O(1) : rien n'est copié ni relu. Chaque
+    lecture passe par la requête bornée du backend (classement indexé,
+    top-N, fiche d'un utilisateur) et son résultat est conservé dans le
+    snapshot, partagé par toutes les commandes jusqu'à la prochaine
+    écriture : un /leaderboard répété ne coûte rien tant que les stats
+    n'ont pas changé. Rien n'est figé pour autant : chaque lecture
+    vérifie la version du backend et, si les stats ont changé depuis,
+    abandonne les résultats conservés. Deux lectures séparées par une
+    écriture peuvent donc refléter deux versions différentes. Les fiches
+    retournées sont partagées entre les commandes : elles ne doivent pas
+    être modifiées.
+    """
+
+    __slots__ = ("version", "_backend", "_results")
+
+    def __init__(self, version: int, backend):
+        self.version = version
+        self._backend = backend
+        self._results: Dict[Hashable, object] = {}
+
+    async def _cached(self, key: Hashable, query, *args):
+        """Résultat de `query(*args)` pour la version courante du backend"""
+        version = self._backend._version
+        if version != self.version:
+            # Stats modifiées depuis le snapshot : les résultats conservés sont périmés
+            self.version = version
+            self._results.clear()
+        if key in self._results:
+            return self._results[key]
+        result = await query(*args)
+        # Écriture pendant la requête : résultat rendu mais pas conservé
+        if self._backend._version == version:
+            self._results[key] = result
+        return result
+
+    async def get_user_stats(self, user_id: int) -> Dict:
+        """Statistiques d'un utilisateur"""
+        return await self._cached(("user", user_id), self._backend.get_user_stats, user_id)
+
+    async def get_user_rank(self, user_id: int) -> int:
+        """Classement d'un utilisateur (0 s'il n'est pas classé)"""
+        return await self._cached(("rank", user_id), self._backend.get_user_rank, user_id)
+
+    async def get_top_users(self, limit: int = 10) -> List[Tuple[str, Dict]]:
+        """Utilisateurs les plus actifs"""
+        return await self._cached(("top_users", limit), self._backend.get_top_users, limit)
+
+    async def get_top_videos(self, limit: int = 10) -> List[Tuple[str, Dict]]:
+        """Vidéos les plus téléchargées"""
+        return await self._cached(("top_videos", limit), self._backend.get_top_videos, limit)
+
+    async def get_trending_videos(self, limit: int = 5, platform: Optional[str] = None) -> List[Tuple[str, Dict, float]]:
+        """Vidéos tendance avec leur score de popularité"""
+        return await self._cached(("trending", limit, platform), self._backend.get_trending_videos, limit, platform)
+
+    async def get_global_stats(self) -> Dict:
+        """Statistiques globales"""
+        return await self._cached(("global",), self._backend.get_global_stats)
+
+    async def get_window_total(self, dimension: str = "platforms", key: Optional[str] = None, granularity: str = "day", count: int = 7) -> int:
+        """Téléchargements sur les `count` dernières heures/jours"""
+        return await self._cached(
+            ("window_total", dimension, key, granularity, count),
+            self._backend.get_window_total, dimension, key, granularity, count,
+        )
+
+    async def get_window_top(self, dimension: str, limit: int = 10, granularity: str = "day", count: int = 7) -> List[Tuple[str, int]]:
+        """Utilisateurs/vidéos/plateformes les plus actifs sur la fenêtre"""
+        return await self._cached(
+            ("window_top", dimension, limit, granularity, count),
+            self._backend.get_window_top, dimension, limit, granularity, count,
+        )
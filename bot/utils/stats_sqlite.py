@@ -0,0 +1,473 @@
+import os
+import sqlite3
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple, Optional
+
+from utils.rollups import GRANULARITIES
+from utils.stats_snapshot import StatsSnapshot
+from utils.trending import TrendingIndex, logaddexp
+from utils.unique_users import UniqueUsers
+from utils.write_behind import WriteBehindQueue
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    downloads INTEGER NOT NULL DEFAULT 0,
+    last_download TEXT
+);
+CREATE TABLE IF NOT EXISTS user_platforms (
+    user_id TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    downloads INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, platform)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS videos (
+    url TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    downloads INTEGER NOT NULL DEFAULT 0,
+    first_download TEXT,
+    unique_users INTEGER NOT NULL DEFAULT 0,
+    trend REAL
+);
+CREATE TABLE IF NOT EXISTS video_downloaders (
+    url TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    PRIMARY KEY (url, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS platforms (
+    platform TEXT PRIMARY KEY,
+    downloads INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    granularity TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    downloads INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, dimension, key, bucket_start)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollups_window ON rollups (granularity, dimension, bucket_start);
+CREATE INDEX IF NOT EXISTS idx_users_downloads ON users (downloads DESC);
+CREATE INDEX IF NOT EXISTS idx_videos_downloads ON videos (downloads DESC);
+INSERT OR IGNORE INTO platforms (platform, downloads) VALUES ('instagram', 0), ('pinterest', 0);
+"""
+
+
+class SQLiteStatsManager:
+    """Gestionnaire de statistiques stocké dans SQLite (mode WAL)
+
+    Expose la même API asynchrone que StatsManager. Toutes les requêtes
+    passent par un thread dédié qui possède la connexion : l'event loop
+    n'attend jamais le disque. Les téléchargements sont écrits par lots
+    (écriture différée) : les lectures les voient après le flush suivant.
+    """
+
+    def __init__(self, db_file: Optional[str] = None):
+        if db_file is None:
+            bot_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            db_file = os.path.join(bot_dir, "data", "stats.sqlite3")
+
+        self.db_file = db_file
+        data_dir = os.path.dirname(self.db_file)
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+
+        # Un seul thread pour toutes les requêtes : la connexion n'est jamais partagée
+        self._trending = TrendingIndex()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stats-sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor.submit(self._connect).result()
+        self._writer = WriteBehindQueue(self._flush, name="stats-sqlite")
+        # Version de la base, incrémentée à chaque lot écrit
+        self._version = 0
+        self._snapshot: Optional[StatsSnapshot] = None
+        print(f"📊 SQLiteStatsManager initialisé avec la base : {self.db_file}")
+
+    def _connect(self):
+        """Ouvre la connexion dans le thread dédié et crée le schéma"""
+        self._conn = sqlite3.connect(self.db_file)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function("logaddexp", 2, logaddexp, deterministic=True)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(videos)")}
+        if "unique_users" not in columns:
+            # Base créée avant le compteur d'utilisateurs distincts
+            self._conn.execute("ALTER TABLE videos ADD COLUMN unique_users INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "UPDATE videos SET unique_users = "
+                "(SELECT COUNT(*) FROM video_downloaders d WHERE d.url = videos.url)"
+            )
+        if "trend" not in columns:
+            # Base créée avant le score de tendance
+            self._conn.execute("ALTER TABLE videos ADD COLUMN trend REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_trend ON videos (trend DESC)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_platform_trend ON videos (platform, trend DESC)")
+        self._conn.commit()
+
+    async def _run(self, func, *args):
+        """Exécute une fonction dans le thread SQLite"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _write_events(self, events: List[Dict]):
+        """Applique une série d'événements de téléchargement dans une transaction"""
+        conn = self._conn
+        with conn:
+            for event in events:
+                timestamp = datetime.fromtimestamp(event["t"]).isoformat()
+                conn.execute(
+                    "INSERT INTO users (user_id, name, downloads, last_download) VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET downloads = downloads + 1, "
+                    "name = excluded.name, last_download = excluded.last_download",
+                    (event["u"], event["n"], timestamp),
+                )
+                conn.execute(
+                    "INSERT INTO user_platforms (user_id, platform, downloads) VALUES (?, ?, 1) "
+                    "ON CONFLICT(user_id, platform) DO UPDATE SET downloads = downloads + 1",
+                    (event["u"], event["p"]),
+                )
+                event_key = self._trending.event_key(event["t"])
+                conn.execute(
+                    "INSERT INTO videos (url, title, platform, downloads, first_download, trend) VALUES (?, ?, ?, 1, ?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET downloads = downloads + 1, trend = logaddexp(trend, excluded.trend)",
+                    (event["v"], event["ti"], event["p"], timestamp, event_key),
+                )
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO video_downloaders (url, user_id) VALUES (?, ?)",
+                    (event["v"], event["u"]),
+                ).rowcount
+                if inserted:
+                    conn.execute(
+                        "UPDATE videos SET unique_users = unique_users + 1 WHERE url = ?",
+                        (event["v"],),
+                    )
+                conn.execute(
+                    "INSERT INTO platforms (platform, downloads) VALUES (?, 1) "
+                    "ON CONFLICT(platform) DO UPDATE SET downloads = downloads + 1",
+                    (event["p"],),
+                )
+                for granularity, (width, _) in GRANULARITIES.items():
+                    start = int(event["t"] // width) * width
+                    conn.executemany(
+                        "INSERT INTO rollups (granularity, bucket_start, dimension, key, downloads) "
+                        "VALUES (?, ?, ?, ?, 1) ON CONFLICT(granularity, dimension, key, bucket_start) "
+                        "DO UPDATE SET downloads = downloads + 1",
+                        [
+                            (granularity, start, "platforms", event["p"]),
+                            (granularity, start, "users", event["u"]),
+                            (granularity, start, "videos", event["v"]),
+                        ],
+                    )
+
+            # Même rétention que les buffers circulaires du backend JSON
+            now = time.time()
+            for granularity, (width, size) in GRANULARITIES.items():
+                conn.execute(
+                    "DELETE FROM rollups WHERE granularity = ? AND bucket_start <= ?",
+                    (granularity, int(now // width) * width - size * width),
+                )
+
+    def _user_platforms(self, user_id: str) -> Dict[str, int]:
+        platforms = {"instagram": 0, "pinterest": 0}
+        for row in self._conn.execute(
+            "SELECT platform, downloads FROM user_platforms WHERE user_id = ?", (user_id,)
+        ):
+            platforms[row["platform"]] = row["downloads"]
+        return platforms
+
+    def _get_user_stats(self, user_id: str) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT name, downloads, last_download FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "name": row["name"],
+            "downloads": row["downloads"],
+            "platforms": self._user_platforms(user_id),
+            "last_download": row["last_download"],
+        }
+
+    def _get_top_users(self, limit: int) -> List[Tuple[str, Dict]]:
+        rows = self._conn.execute(
+            "SELECT user_id, name, downloads, last_download FROM users "
+            "ORDER BY downloads DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [
+            (
+                row["user_id"],
+                {
+                    "name": row["name"],
+                    "downloads": row["downloads"],
+                    "platforms": self._user_platforms(row["user_id"]),
+                    "last_download": row["last_download"],
+                },
+            )
+            for row in rows
+        ]
+
+    def _get_top_videos(self, limit: int) -> List[Tuple[str, Dict]]:
+        rows = self._conn.execute(
+            "SELECT url, title, platform, downloads, first_download, unique_users, trend FROM videos "
+            "ORDER BY downloads DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [(row["url"], self._video_record(row)) for row in rows]
+
+    def _get_trending_videos(self, limit: int, platform: Optional[str]) -> List[Tuple[str, Dict, float]]:
+        query = "SELECT url, title, platform, downloads, first_download, unique_users, trend FROM videos WHERE trend IS NOT NULL"
+        params: list = []
+        if platform is not None:
+            query += " AND platform = ?"
+            params.append(platform)
+        rows = self._conn.execute(query + " ORDER BY trend DESC LIMIT ?", params + [limit]).fetchall()
+        return [(row["url"], self._video_record(row), self._trending.score(row["trend"])) for row in rows]
+
+    @staticmethod
+    def _video_record(row: sqlite3.Row) -> Dict:
+        return {
+            "title": row["title"],
+            "platform": row["platform"],
+            "downloads": row["downloads"],
+            "first_download": row["first_download"],
+            "unique_users": row["unique_users"],
+            "trend": row["trend"],
+        }
+
+    def _get_video_stats(self, video_url: str) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT url, title, platform, downloads, first_download, unique_users, trend FROM videos WHERE url = ?",
+            (video_url,),
+        ).fetchone()
+        return self._video_record(row) if row else None
+
+    def _get_global_stats(self) -> Dict:
+        platforms = {
+            row["platform"]: row["downloads"]
+            for row in self._conn.execute("SELECT platform, downloads FROM platforms")
+        }
+        return {
+            "total_downloads": sum(platforms.values()),
+            "total_users": self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0],
+            "total_videos": self._conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0],
+            "platforms": platforms,
+        }
+
+    def _get_window_total(self, dimension: str, key: Optional[str], granularity: str, count: int) -> int:
+        width, size = GRANULARITIES[granularity]
+        since = int(time.time() // width) * width - (min(count, size) - 1) * width
+        query = "SELECT COALESCE(SUM(downloads), 0) FROM rollups WHERE granularity = ? AND dimension = ? AND bucket_start >= ?"
+        params = [granularity, dimension, since]
+        if key is not None:
+            query += " AND key = ?"
+            params.append(key)
+        return self._conn.execute(query, params).fetchone()[0]
+
+    def _get_window_top(self, dimension: str, limit: int, granularity: str, count: int) -> List[Tuple[str, int]]:
+        width, size = GRANULARITIES[granularity]
+        since = int(time.time() // width) * width - (min(count, size) - 1) * width
+        rows = self._conn.execute(
+            "SELECT key, SUM(downloads) AS total FROM rollups "
+            "WHERE granularity = ? AND dimension = ? AND bucket_start >= ? "
+            "GROUP BY key ORDER BY total DESC LIMIT ?",
+            (granularity, dimension, since, limit),
+        ).fetchall()
+        return [(row["key"], row["total"]) for row in rows]
+
+    def _get_user_rank(self, user_id: str) -> int:
+        row = self._conn.execute(
+            "SELECT downloads FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return 0  # Utilisateur pas dans le classement
+        # Parcours de l'index idx_users_downloads : O(log n + rang)
+        return self._conn.execute(
+            "SELECT COUNT(*) + 1 FROM users WHERE downloads > ?", (row["downloads"],)
+        ).fetchone()[0]
+
+    async def _flush(self, events: List[Dict]):
+        """Callback de la file d'écriture différée : un lot = une transaction"""
+        await self._run(self._write_events, events)
+        if events:
+            self._version += 1
+
+    async def snapshot(self) -> StatsSnapshot:
+        """Vue versionnée des agrégats, renouvelée après chaque lot écrit
+
+        O(1) : aucune table n'est relue. Chaque lecture du snapshot exécute
+        la requête indexée correspondante (top-N, rang, fiche) une seule
+        fois par version ; une lecture après un nouveau lot la relance.
+        """
+        if self._snapshot is None or self._snapshot.version != self._version:
+            self._snapshot = StatsSnapshot(self._version, self)
+        return self._snapshot
+
+    async def checkpoint(self):
+        """Écrit immédiatement les téléchargements en attente"""
+        await self._writer.flush()
+
+    async def close(self):
+        """Vide la file d'écriture puis ferme la connexion (arrêt du bot)"""
+        if self._conn is None:
+            return  # Déjà fermé
+        await self._writer.close()
+
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await self._run(_close)
+        self._executor.shutdown(wait=True)
+
+    def get_writer_metrics(self) -> Dict:
+        """Profondeur de la file d'écriture et latence des flush"""
+        return self._writer.metrics()
+
+    async def record_download(self, user_id: int, user_name: str, platform: str, video_url: str, video_title: str = "Vidéo sans titre"):
+        """Enregistre un téléchargement (O(1) : l'écriture est différée)"""
+        print(f"📊 Enregistrement du téléchargement : user={user_name}, platform={platform}")
+        self._writer.enqueue({
+            "t": time.time(),
+            "u": str(user_id),
+            "n": user_name,
+            "p": platform,
+            "v": video_url,
+            "ti": video_title
+        })
+
+    async def get_user_stats(self, user_id: int) -> Dict:
+        """Récupère les statistiques d'un utilisateur"""
+        user_stats = await self._run(self._get_user_stats, str(user_id))
+        if user_stats is None:
+            return {
+                "downloads": 0,
+                "platforms": {"instagram": 0, "pinterest": 0},
+                "last_download": None
+            }
+        return user_stats
+
+    async def get_top_users(self, limit: int = 10) -> List[Tuple[str, Dict]]:
+        """Récupère le classement des utilisateurs les plus actifs"""
+        return await self._run(self._get_top_users, limit)
+
+    async def get_top_videos(self, limit: int = 10) -> List[Tuple[str, Dict]]:
+        """Récupère les vidéos les plus téléchargées"""
+        return await self._run(self._get_top_videos, limit)
+
+    async def get_global_stats(self) -> Dict:
+        """Récupère les statistiques globales"""
+        return await self._run(self._get_global_stats)
+
+    async def get_video_stats(self, video_url: str) -> Optional[Dict]:
+        """Fiche d'une vidéo (None si elle n'a jamais été téléchargée)"""
+        return await self._run(self._get_video_stats, video_url)
+
+    async def get_window_total(self, dimension: str = "platforms", key: Optional[str] = None, granularity: str = "day", count: int = 7) -> int:
+        """Téléchargements sur les `count` dernières heures/jours"""
+        return await self._run(self._get_window_total, dimension, key, granularity, count)
+
+    async def get_window_top(self, dimension: str, limit: int = 10, granularity: str = "day", count: int = 7) -> List[Tuple[str, int]]:
+        """Utilisateurs/vidéos/plateformes les plus actifs sur la fenêtre"""
+        return await self._run(self._get_window_top, dimension, limit, granularity, count)
+
+    async def get_trending_videos(self, limit: int = 5, platform: Optional[str] = None) -> List[Tuple[str, Dict, float]]:
+        """Vidéos tendance (score à décroissance exponentielle), via l'index sur trend"""
+        return await self._run(self._get_trending_videos, limit, platform)
+
+    async def get_user_rank(self, user_id: int) -> int:
+        """Récupère le classement d'un utilisateur"""
+        return await self._run(self._get_user_rank, str(user_id))
+
+    def import_stats(self, stats: Dict):
+        """Importe des agrégats au format stats.json (remplace le contenu existant)"""
+
+        def _import():
+            conn = self._conn
+            with conn:
+                for table in ("users", "user_platforms", "videos", "video_downloaders", "platforms", "rollups"):
+                    conn.execute(f"DELETE FROM {table}")
+
+                conn.executemany(
+                    "INSERT INTO users (user_id, name, downloads, last_download) VALUES (?, ?, ?, ?)",
+                    [
+                        (uid, u.get("name", ""), u.get("downloads", 0), u.get("last_download"))
+                        for uid, u in stats.get("users", {}).items()
+                    ],
+                )
+                conn.executemany(
+                    "INSERT INTO user_platforms (user_id, platform, downloads) VALUES (?, ?, ?)",
+                    [
+                        (uid, platform, count)
+                        for uid, u in stats.get("users", {}).items()
+                        for platform, count in u.get("platforms", {}).items()
+                    ],
+                )
+                for url, v in stats.get("videos", {}).items():
+                    if "downloaded_by" in v:
+                        downloaders = UniqueUsers.from_ids(v["downloaded_by"])
+                    else:
+                        downloaders = UniqueUsers.decode(v.get("downloaders", ""))
+                    conn.execute(
+                        "INSERT INTO videos (url, title, platform, downloads, first_download, unique_users, trend) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (url, v.get("title", "Vidéo sans titre"), v.get("platform", "inconnu"),
+                         v.get("downloads", 0), v.get("first_download"), len(downloaders), v.get("trend")),
+                    )
+                    # En mode HyperLogLog seuls les compteurs sont conservés
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO video_downloaders (url, user_id) VALUES (?, ?)",
+                        [(url, str(uid)) for uid in downloaders],
+                    )
+                conn.executemany(
+                    "INSERT INTO platforms (platform, downloads) VALUES (?, ?)",
+                    list(stats.get("platforms", {}).items()),
+                )
+                conn.executemany(
+                    "INSERT INTO rollups (granularity, bucket_start, dimension, key, downloads) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (granularity, slot["start"], dimension, key, count)
+                        for granularity, slots in stats.get("rollups", {}).items()
+                        for slot in slots
+                        for dimension in ("platforms", "users", "videos")
+                        for key, count in slot[dimension].items()
+                    ],
+                )
+
+        self._executor.submit(_import).result()
+        self._version += 1
+
+
+def migrate_from_json(stats_file: str, db_file: str) -> SQLiteStatsManager:
+    """Migration unique de stats.json (et de son journal) vers SQLite"""
+    # Import des classes seules : l'instance globale (fichiers par défaut) n'est pas créée
+    from utils.stats_manager import ReadOnlyStatsManager
+
+    if not os.path.exists(stats_file):
+        raise FileNotFoundError(f"Fichier de stats introuvable : {stats_file}")
+    # Lecture seule : stats.json, son journal et l'archive restent intacts
+    source = ReadOnlyStatsManager(stats_file)
+    target = SQLiteStatsManager(db_file)
+    target.import_stats(source.export_stats())
+    print(
+        f"✅ Migration terminée : {len(source.data['users'])} utilisateurs, "
+        f"{len(source.data['videos'])} vidéos importés dans {db_file}"
+    )
+    return target
+
+
+if __name__ == "__main__":
+    # Usage : python -m utils.stats_sqlite [data/stats.json] [data/stats.sqlite3]
+    bot_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    src = sys.argv[1] if len(sys.argv) > 1 else os.path.join(bot_dir, "data", "stats.json")
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.join(bot_dir, "data", "stats.sqlite3")
+    migrate_from_json(src, dst)
@@ -0,0 +1,56 @@
+import logging
+from typing import Dict, Optional
+
+import aiohttp
+
+from utils.rate_limiter import tiktok_rate_limiter
+
+# Endpoint JSON utilisé par la page web pour afficher le badge "LIVE"
+LIVE_ROOM_URL = "https://www.tiktok.com/api-live/user/room/"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json",
+}
+# Statut de salle TikTok : 2 = live en cours
+LIVE_STATUS = 2
+
+
+def parse_live_room(payload: Dict) -> Optional[Dict]:
+    """Extrait le statut de live d'une réponse api-live (None si illisible)"""
+    if not isinstance(payload, dict) or payload.get("statusCode", 0) != 0:
+        return None
+    data = payload.get("data")
+    if not isinstance(data, dict) or not isinstance(data.get("user"), dict):
+        return None
+
+    user = data["user"]
+    room = data.get("liveRoom") or {}
+    status = room.get("status", user.get("status"))
+    is_live = status == LIVE_STATUS
+    return {
+        "is_live": is_live,
+        "room_id": str(user["roomId"]) if is_live and user.get("roomId") else None,
+        "title": room.get("title") if is_live else None,
+        "thumbnail": room.get("coverUrl") if is_live else None,
+    }
+
+
+async def probe_live(session: aiohttp.ClientSession, username: str, timeout: float = 10) -> Optional[Dict]:
+    """Sonde légère du statut de live d'un compte (une requête JSON, sans yt-dlp)
+
+    Retourne {"is_live", "room_id", "title", "thumbnail"}, ou None si la
+    sonde a échoué : l'appelant garde alors l'état connu.
+    """
+    await tiktok_rate_limiter.acquire()
+    params = {"aid": "1988", "sourceType": "54", "uniqueId": username}
+    try:
+        async with session.get(
+            LIVE_ROOM_URL, params=params, headers=HEADERS, timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            if response.status != 200:
+                return None
+            payload = await response.json(content_type=None)
+    except Exception as e:
+        logging.debug(f"Sonde live @{username} échouée : {e}")
+        return None
+    return parse_live_room(payload)
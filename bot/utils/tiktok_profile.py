@@ -0,0 +1,140 @@
+import json
+import logging
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from utils.rate_limiter import tiktok_rate_limiter
+
+PROFILE_URL = "https://www.tiktok.com/@{username}"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
+}
+# Blocs JSON embarqués dans la page de profil, du plus récent au plus ancien format
+EMBEDDED_SCRIPTS = ("__UNIVERSAL_DATA_FOR_REHYDRATION__", "SIGI_STATE")
+
+# Vidéos lues par le repli yt-dlp : assez pour dépasser les vidéos épinglées (3 au plus)
+FALLBACK_ITEMS = 4
+
+# Compteurs du chemin rapide (page analysée / repli sur yt-dlp)
+profile_stats = {"parsed": 0, "fallbacks": 0}
+
+
+def _script_json(html: str, script_id: str) -> Optional[Dict]:
+    """Contenu JSON d'une balise <script id="..."> (recherche ciblée, sans parser le HTML)"""
+    marker = html.find(f'id="{script_id}"')
+    if marker == -1:
+        return None
+    start = html.find(">", marker)
+    end = html.find("</script>", start)
+    if start == -1 or end == -1:
+        return None
+    try:
+        return json.loads(html[start + 1:end])
+    except ValueError:
+        return None
+
+
+def _entry(item: Dict, unique_id: str) -> Dict:
+    """Vidéo au format des entrées yt-dlp (extract_flat)"""
+    video_id = str(item["id"])
+    return {
+        "id": video_id,
+        "title": item.get("desc") or "Nouvelle vidéo TikTok",
+        "timestamp": int(item["createTime"]) if item.get("createTime") else None,
+        "thumbnail": (item.get("video") or {}).get("cover"),
+        "url": f"https://www.tiktok.com/@{unique_id}/video/{video_id}",
+    }
+
+
+def _created_at(entry: Dict) -> int:
+    """Date de création d'une vidéo ; à défaut, celle encodée dans les 32 bits de poids fort de son identifiant"""
+    if entry.get("timestamp"):
+        return int(entry["timestamp"])
+    try:
+        return int(entry.get("id") or 0) >> 32
+    except (TypeError, ValueError):
+        return 0
+
+
+def latest_entry(entries: List[Dict]) -> Optional[Dict]:
+    """Vidéo la plus récente d'une liste d'entrées, vidéos épinglées comprises
+
+    Le chemin rapide et le repli yt-dlp passent tous deux par ici : ils
+    retiennent la même vidéo, quel que soit l'ordre de la liste.
+    """
+    entries = [entry for entry in entries if isinstance(entry, dict) and entry.get("id")]
+    if not entries:
+        return None
+    return max(entries, key=lambda entry: (_created_at(entry), str(entry["id"])))
+
+
+def with_latest_entry(info: Dict) -> Dict:
+    """Résultat yt-dlp réduit à sa vidéo la plus récente (voir `latest_entry`)"""
+    latest = latest_entry(info.get("entries") or [])
+    return dict(info, entries=[latest] if latest else [])
+
+
+def _profile_info(user: Dict, items: List[Dict]) -> Optional[Dict]:
+    """Résultat au format de yt-dlp : dernière vidéo dans `entries` et drapeau `is_live`"""
+    items = [item for item in items if isinstance(item, dict) and item.get("id")]
+    if not user or not items:
+        return None  # Profil sans liste de vidéos embarquée : repli sur yt-dlp
+
+    unique_id = user.get("uniqueId", "")
+    room_id = str(user.get("roomId") or "")
+    is_live = room_id not in ("", "0")
+    # La vidéo épinglée peut précéder les autres : on retient la plus récente
+    latest = latest_entry([_entry(item, unique_id) for item in items])
+    return {
+        "id": room_id if is_live else str(user.get("id", "")),
+        "uploader": unique_id,
+        "is_live": is_live,
+        "entries": [latest],
+    }
+
+
+def parse_profile_html(html: str) -> Optional[Dict]:
+    """Extrait dernière vidéo et statut de live de la page de profil (None si non reconnue)"""
+    universal = _script_json(html, "__UNIVERSAL_DATA_FOR_REHYDRATION__")
+    if universal:
+        scope = universal.get("__DEFAULT_SCOPE__", {})
+        detail = scope.get("webapp.user-detail", {})
+        user = (detail.get("userInfo") or {}).get("user", {})
+        items = detail.get("itemList") or (scope.get("webapp.user-post") or {}).get("itemList") or []
+        info = _profile_info(user, items)
+        if info:
+            return info
+
+    sigi = _script_json(html, "SIGI_STATE")
+    if sigi:
+        users = (sigi.get("UserModule") or {}).get("users", {})
+        user = next(iter(users.values()), {})
+        unique_id = user.get("uniqueId")
+        items = [
+            item for item in (sigi.get("ItemModule") or {}).values()
+            if isinstance(item, dict) and item.get("author", unique_id) == unique_id
+        ]
+        return _profile_info(user, items)
+    return None
+
+
+async def fetch_profile(session: aiohttp.ClientSession, username: str, timeout: float = 15) -> Optional[Dict]:
+    """Lit la page de profil en une requête HTTP (None si elle n'a pas pu être analysée)"""
+    await tiktok_rate_limiter.acquire()
+    try:
+        async with session.get(
+            PROFILE_URL.format(username=username), headers=HEADERS, timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            if response.status != 200:
+                info = None
+            else:
+                info = parse_profile_html(await response.text())
+    except Exception as e:
+        logging.debug(f"Page de profil @{username} illisible : {e}")
+        info = None
+
+    profile_stats["parsed" if info else "fallbacks"] += 1
+    return info
@@ -1,16 +1,76 @@
+import asyncio
 import json
 import os
 import logging
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.atomic_io import write_json_atomic
+
+# Délai maximal (secondes) avant l'écriture des changements d'état de suivi
+FLUSH_INTERVAL = float(os.getenv("TIKTOK_TRACKER_FLUSH_INTERVAL", 30))
+
+# Stockages disponibles pour TIKTOK_TRACKER_BACKEND :
+# - "json"   : TikTokTracker (tiktok_linked.json réécrit en entier)
+# - "sqlite" : SQLiteTikTokTracker (une ligne par abonnement, mode WAL)
+TRACKER_BACKENDS = ("json", "sqlite")
 
 
 class TikTokTracker:
-    """Gestionnaire pour suivre les comptes TikTok liés et leurs vidéos"""
+    """Gestionnaire pour suivre les comptes TikTok liés et leurs vidéos
 
-    def __init__(self, data_file="data/tiktok_linked.json"):
+    Les liaisons (link/unlink, canal de notification) sont écrites
+    immédiatement. Les mises à jour de suivi (dernière vidéo, live, état de
+    planification) marquent seulement les données comme modifiées : elles
+    sont regroupées et écrites par `flush()` dans un thread, au plus tard
+    toutes les `flush_interval` secondes.
+    """
+
+    def __init__(self, data_file="data/tiktok_linked.json", flush_interval: Optional[float] = None):
         self.data_file = data_file
+        self.flush_interval = flush_interval or FLUSH_INTERVAL
         self.data = self.load_data()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        # Écritures numérotées : une copie plus ancienne n'écrase jamais une plus récente
+        self._generation = 0
+        self._written_generation = 0
+        self._write_lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self.flushes = 0
+        # État de suivi par compte TikTok (rythme de publication, prochaine vérification)
+        self.data.setdefault("accounts", {})
+        # Index inversé : nom TikTok (minuscules) -> abonnements (guild_id, user_id)
+        self._subscribers: Dict[str, Set[Tuple[str, str]]] = {}
+        self._rebuild_subscribers()
+
+    @staticmethod
+    def _username_key(tiktok_username: str) -> str:
+        """Les noms TikTok ne sont pas sensibles à la casse"""
+        return tiktok_username.lower()
+
+    def _rebuild_subscribers(self):
+        """Reconstruit l'index inversé à partir des comptes liés"""
+        self._subscribers = {}
+        for guild_str, guild_data in self.data["guilds"].items():
+            for user_str, user_data in guild_data["linked_users"].items():
+                self._add_subscriber(user_data["tiktok_username"], guild_str, user_str)
+
+    def _add_subscriber(self, tiktok_username: str, guild_str: str, user_str: str):
+        key = self._username_key(tiktok_username)
+        self._subscribers.setdefault(key, set()).add((guild_str, user_str))
+
+    def _remove_subscriber(self, tiktok_username: str, guild_str: str, user_str: str):
+        key = self._username_key(tiktok_username)
+        subscribers = self._subscribers.get(key)
+        if subscribers is None:
+            return
+        subscribers.discard((guild_str, user_str))
+        if not subscribers:
+            del self._subscribers[key]
+            self.data["accounts"].pop(key, None)
 
     def load_data(self) -> Dict:
         """Charge les données des comptes liés"""
@@ -23,15 +83,70 @@ class TikTokTracker:
                 return {"guilds": {}, "users": {}}
         return {"guilds": {}, "users": {}}
 
+    def _snapshot(self) -> Tuple[int, Dict]:
+        """Copie des données à écrire hors de la boucle, avec son numéro d'écriture
+
+        Les états de suivi (`accounts`) sont remplacés en bloc par
+        `update_account_state` : une copie superficielle suffit.
+        """
+        snapshot = dict(self.data)
+        snapshot["guilds"] = {
+            guild_str: {
+                **guild_data,
+                "linked_users": {
+                    user_str: dict(user_data)
+                    for user_str, user_data in guild_data["linked_users"].items()
+                },
+            }
+            for guild_str, guild_data in self.data["guilds"].items()
+        }
+        snapshot["users"] = {user_str: dict(guilds) for user_str, guilds in self.data["users"].items()}
+        snapshot["accounts"] = dict(self.data["accounts"])
+        self._generation += 1
+        self._dirty = False
+        return self._generation, snapshot
+
+    def _write(self, generation: int, snapshot: Dict):
+        """Écriture atomique d'une copie (ignorée si une copie plus récente est déjà écrite)"""
+        with self._write_lock:
+            if generation <= self._written_generation:
+                return
+            write_json_atomic(self.data_file, snapshot, indent=4)
+            self._written_generation = generation
+
     def save_data(self):
-        """Sauvegarde les données"""
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
+        """Sauvegarde immédiate des données (liaisons)"""
+        generation, snapshot = self._snapshot()
         try:
-            with open(self.data_file, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, indent=4, ensure_ascii=False)
+            self._write(generation, snapshot)
+            self._last_flush = time.monotonic()
         except Exception as e:
+            self._dirty = True
             logging.error(f"❌ Erreur lors de la sauvegarde: {e}")
 
+    def _mark_dirty(self):
+        """Changement de suivi à écrire au prochain `flush()`"""
+        self._dirty = True
+
+    async def flush(self):
+        """Écrit les changements en attente dans un thread (une seule écriture à la fois)"""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            generation, snapshot = self._snapshot()
+            try:
+                await asyncio.to_thread(self._write, generation, snapshot)
+                self.flushes += 1
+            except Exception as e:
+                self._dirty = True
+                logging.error(f"❌ Erreur lors de la sauvegarde: {e}")
+            self._last_flush = time.monotonic()
+
+    async def flush_if_due(self):
+        """Écrit les changements en attente si le délai d'écriture est écoulé"""
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
     def link_account(self, guild_id: int, user_id: int, tiktok_username: str) -> bool:
         """Lie un compte TikTok à un utilisateur Discord"""
         guild_str = str(guild_id)
@@ -50,6 +165,7 @@ class TikTokTracker:
             ]
             if old_username == tiktok_username:
                 return False  # Déjà lié au même compte
+            self._remove_subscriber(old_username, guild_str, user_str)
 
         self.data["guilds"][guild_str]["linked_users"][user_str] = {
             "tiktok_username": tiktok_username,
@@ -64,6 +180,7 @@ class TikTokTracker:
         if user_str not in self.data["users"]:
             self.data["users"][user_str] = {}
         self.data["users"][user_str][guild_str] = tiktok_username
+        self._add_subscriber(tiktok_username, guild_str, user_str)
 
         self.save_data()
         return True
@@ -79,7 +196,8 @@ class TikTokTracker:
         if user_str not in self.data["guilds"][guild_str]["linked_users"]:
             return False
 
-        del self.data["guilds"][guild_str]["linked_users"][user_str]
+        user_data = self.data["guilds"][guild_str]["linked_users"].pop(user_str)
+        self._remove_subscriber(user_data["tiktok_username"], guild_str, user_str)
 
         # Nettoyer l'index global
         if user_str in self.data["users"] and guild_str in self.data["users"][user_str]:
@@ -147,7 +265,7 @@ class TikTokTracker:
             self.data["guilds"][guild_str]["linked_users"][user_str][
                 "last_checked"
             ] = datetime.now().isoformat()
-            self.save_data()
+            self._mark_dirty()
 
     def update_live_status(
         self, guild_id: int, user_id: int, is_live: bool, live_id: Optional[str] = None
@@ -170,27 +288,75 @@ class TikTokTracker:
             self.data["guilds"][guild_str]["linked_users"][user_str][
                 "last_checked"
             ] = datetime.now().isoformat()
-            self.save_data()
+            self._mark_dirty()
+
+    @staticmethod
+    def _account(guild_id: str, user_id: str, user_data: Dict) -> Dict:
+        """Vue d'un abonnement (guild, utilisateur) avec son état de suivi"""
+        return {
+            "guild_id": int(guild_id),
+            "user_id": int(user_id),
+            "tiktok_username": user_data["tiktok_username"],
+            "last_video_id": user_data.get("last_video_id"),
+            "last_checked": user_data.get("last_checked"),
+            "is_live": user_data.get("is_live", False),
+            "last_live_id": user_data.get("last_live_id"),
+        }
 
     def get_all_tracked_accounts(self) -> List[Dict]:
         """Récupère tous les comptes à surveiller"""
         accounts = []
         for guild_id, guild_data in self.data["guilds"].items():
             for user_id, user_data in guild_data["linked_users"].items():
-                accounts.append(
-                    {
-                        "guild_id": int(guild_id),
-                        "user_id": int(user_id),
-                        "tiktok_username": user_data["tiktok_username"],
-                        "last_video_id": user_data.get("last_video_id"),
-                        "last_checked": user_data.get("last_checked"),
-                        "is_live": user_data.get("is_live", False),
-                        "last_live_id": user_data.get("last_live_id"),
-                    }
-                )
+                accounts.append(self._account(guild_id, user_id, user_data))
+
+        return accounts
 
+    def get_subscriptions(self, tiktok_username: str) -> List[Dict]:
+        """Récupère tous les abonnements (guild, utilisateur) à un compte TikTok"""
+        accounts = []
+        for guild_str, user_str in self._subscribers.get(self._username_key(tiktok_username), ()):
+            user_data = self.data["guilds"][guild_str]["linked_users"][user_str]
+            accounts.append(self._account(guild_str, user_str, user_data))
         return accounts
 
+    def get_account_state(self, tiktok_username: str) -> Dict:
+        """Récupère l'état de suivi d'un compte TikTok (copie)"""
+        return dict(self.data["accounts"].get(self._username_key(tiktok_username), {}))
+
+    def update_account_state(self, tiktok_username: str, state: Dict):
+        """Enregistre l'état de suivi d'un compte TikTok encore surveillé"""
+        if not self.is_tracked(tiktok_username):
+            return
+        self.data["accounts"][self._username_key(tiktok_username)] = state
+        self._mark_dirty()
+
+    def is_tracked(self, tiktok_username: str) -> bool:
+        """Vrai si au moins un utilisateur a lié ce compte TikTok"""
+        return self._username_key(tiktok_username) in self._subscribers
+
+    def get_tracked_usernames(self) -> List[str]:
+        """Comptes TikTok distincts à surveiller (un seul fetch par compte et par cycle)"""
+        return list(self._subscribers)
+
+
+def create_tiktok_tracker(backend: Optional[str] = None, data_file: str = "data/tiktok_linked.json"):
+    """Instancie le stockage choisi par TIKTOK_TRACKER_BACKEND ("json" ou "sqlite")
+
+    Au premier démarrage en SQLite, les comptes liés de `data_file` sont importés.
+    """
+    backend = backend or os.getenv("TIKTOK_TRACKER_BACKEND", "json")
+    if backend not in TRACKER_BACKENDS:
+        raise ValueError(f"Backend de suivi TikTok inconnu : {backend}")
+    if backend == "sqlite":
+        from utils.tiktok_tracker_sqlite import SQLiteTikTokTracker, migrate_from_json
+
+        db_file = os.path.splitext(data_file)[0] + ".sqlite3"
+        if not os.path.exists(db_file) and os.path.exists(data_file):
+            return migrate_from_json(data_file, db_file)
+        return SQLiteTikTokTracker(db_file)
+    return TikTokTracker(data_file)
+
 
 # Instance globale
-tiktok_tracker = TikTokTracker()
+tiktok_tracker = create_tiktok_tracker()
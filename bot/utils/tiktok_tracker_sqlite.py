@@ -0,0 +1,328 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from utils.tiktok_tracker import FLUSH_INTERVAL, TikTokTracker
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guilds (
+    guild_id TEXT PRIMARY KEY,
+    notification_channel INTEGER
+);
+CREATE TABLE IF NOT EXISTS subscriptions (
+    guild_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    tiktok_username TEXT NOT NULL,
+    username_key TEXT NOT NULL,
+    linked_at TEXT,
+    last_checked TEXT,
+    last_video_id TEXT,
+    is_live INTEGER NOT NULL DEFAULT 0,
+    last_live_id TEXT,
+    PRIMARY KEY (guild_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_subscriptions_user ON subscriptions (user_id);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_username ON subscriptions (username_key);
+CREATE TABLE IF NOT EXISTS accounts (
+    username_key TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+"""
+
+
+class SQLiteTikTokTracker:
+    """Comptes TikTok liés stockés dans SQLite (mode WAL)
+
+    Même API que TikTokTracker. Chaque abonnement (guild, utilisateur) est
+    une ligne de `subscriptions`, indexée par serveur, par utilisateur
+    Discord et par nom TikTok : les lectures ne parcourent que les lignes
+    concernées et les mises à jour n'écrivent que la ligne modifiée.
+
+    Les liaisons sont validées immédiatement. Les mises à jour de suivi
+    restent dans la transaction ouverte (visibles par les lectures) et
+    sont validées par `flush()` dans un thread.
+    """
+
+    def __init__(self, db_file="data/tiktok_linked.sqlite3", flush_interval: Optional[float] = None):
+        self.db_file = db_file
+        data_dir = os.path.dirname(self.db_file)
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+        self.flush_interval = flush_interval or FLUSH_INTERVAL
+
+        # Connexion partagée entre la boucle et le thread d'écriture, protégée par un verrou
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        # Nombre d'abonnements par compte TikTok (minuscules) : is_tracked en O(1)
+        self._tracked: Dict[str, int] = {}
+        for row in self._conn.execute(
+            "SELECT username_key, COUNT(*) AS n FROM subscriptions GROUP BY username_key"
+        ):
+            self._tracked[row["username_key"]] = row["n"]
+
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._flush_lock = asyncio.Lock()
+        self.flushes = 0
+
+    _username_key = staticmethod(TikTokTracker._username_key)
+
+    @staticmethod
+    def _user_data(row: sqlite3.Row) -> Dict:
+        """Ligne d'abonnement au format de tiktok_linked.json"""
+        return {
+            "tiktok_username": row["tiktok_username"],
+            "linked_at": row["linked_at"],
+            "last_checked": row["last_checked"],
+            "last_video_id": row["last_video_id"],
+            "is_live": bool(row["is_live"]),
+            "last_live_id": row["last_live_id"],
+        }
+
+    def _account(self, row: sqlite3.Row) -> Dict:
+        return TikTokTracker._account(row["guild_id"], row["user_id"], self._user_data(row))
+
+    def _commit(self):
+        with self._lock:
+            self._dirty = False
+            self._conn.commit()
+
+    def save_data(self):
+        """Valide immédiatement la transaction en cours (liaisons)"""
+        try:
+            self._commit()
+            self._last_flush = time.monotonic()
+        except Exception as e:
+            self._dirty = True
+            logging.error(f"❌ Erreur lors de la sauvegarde: {e}")
+
+    async def flush(self):
+        """Valide les mises à jour de suivi en attente dans un thread"""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            try:
+                await asyncio.to_thread(self._commit)
+                self.flushes += 1
+            except Exception as e:
+                self._dirty = True
+                logging.error(f"❌ Erreur lors de la sauvegarde: {e}")
+            self._last_flush = time.monotonic()
+
+    async def flush_if_due(self):
+        """Valide les mises à jour en attente si le délai d'écriture est écoulé"""
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _untrack(self, tiktok_username: str):
+        """Un abonnement de moins ; l'état de suivi est oublié avec le dernier abonné"""
+        key = self._username_key(tiktok_username)
+        remaining = self._tracked.get(key, 1) - 1
+        if remaining:
+            self._tracked[key] = remaining
+        else:
+            self._tracked.pop(key, None)
+            self._execute("DELETE FROM accounts WHERE username_key = ?", (key,))
+
+    def link_account(self, guild_id: int, user_id: int, tiktok_username: str) -> bool:
+        """Lie un compte TikTok à un utilisateur Discord"""
+        guild_str = str(guild_id)
+        user_str = str(user_id)
+
+        rows = self._query(
+            "SELECT tiktok_username FROM subscriptions WHERE guild_id = ? AND user_id = ?",
+            (guild_str, user_str),
+        )
+        if rows:
+            if rows[0]["tiktok_username"] == tiktok_username:
+                return False  # Déjà lié au même compte
+            self._untrack(rows[0]["tiktok_username"])
+
+        key = self._username_key(tiktok_username)
+        self._execute("INSERT OR IGNORE INTO guilds (guild_id) VALUES (?)", (guild_str,))
+        self._execute(
+            "INSERT OR REPLACE INTO subscriptions "
+            "(guild_id, user_id, tiktok_username, username_key, linked_at, last_checked, last_video_id, is_live, last_live_id) "
+            "VALUES (?, ?, ?, ?, ?, NULL, NULL, 0, NULL)",
+            (guild_str, user_str, tiktok_username, key, datetime.now().isoformat()),
+        )
+        self._tracked[key] = self._tracked.get(key, 0) + 1
+
+        self.save_data()
+        return True
+
+    def unlink_account(self, guild_id: int, user_id: int) -> bool:
+        """Délie un compte TikTok"""
+        guild_str = str(guild_id)
+        user_str = str(user_id)
+
+        rows = self._query(
+            "SELECT tiktok_username FROM subscriptions WHERE guild_id = ? AND user_id = ?",
+            (guild_str, user_str),
+        )
+        if not rows:
+            return False
+
+        self._execute("DELETE FROM subscriptions WHERE guild_id = ? AND user_id = ?", (guild_str, user_str))
+        self._untrack(rows[0]["tiktok_username"])
+
+        self.save_data()
+        return True
+
+    def get_linked_account(self, guild_id: int, user_id: int) -> Optional[str]:
+        """Récupère le compte TikTok lié d'un utilisateur"""
+        rows = self._query(
+            "SELECT tiktok_username FROM subscriptions WHERE guild_id = ? AND user_id = ?",
+            (str(guild_id), str(user_id)),
+        )
+        return rows[0]["tiktok_username"] if rows else None
+
+    def get_all_linked_users(self, guild_id: int) -> Dict:
+        """Récupère tous les utilisateurs liés d'un serveur"""
+        rows = self._query("SELECT * FROM subscriptions WHERE guild_id = ?", (str(guild_id),))
+        return {row["user_id"]: self._user_data(row) for row in rows}
+
+    def set_notification_channel(self, guild_id: int, channel_id: int):
+        """Définit le canal de notification pour un serveur"""
+        self._execute(
+            "INSERT INTO guilds (guild_id, notification_channel) VALUES (?, ?) "
+            "ON CONFLICT(guild_id) DO UPDATE SET notification_channel = excluded.notification_channel",
+            (str(guild_id), channel_id),
+        )
+        self.save_data()
+
+    def get_notification_channel(self, guild_id: int) -> Optional[int]:
+        """Récupère le canal de notification d'un serveur"""
+        rows = self._query("SELECT notification_channel FROM guilds WHERE guild_id = ?", (str(guild_id),))
+        return rows[0]["notification_channel"] if rows else None
+
+    def update_last_video(self, guild_id: int, user_id: int, video_id: str):
+        """Met à jour le dernier ID de vidéo vérifié"""
+        self._execute(
+            "UPDATE subscriptions SET last_video_id = ?, last_checked = ? WHERE guild_id = ? AND user_id = ?",
+            (video_id, datetime.now().isoformat(), str(guild_id), str(user_id)),
+        )
+        self._dirty = True
+
+    def update_live_status(
+        self, guild_id: int, user_id: int, is_live: bool, live_id: Optional[str] = None
+    ):
+        """Met à jour le statut de live d'un utilisateur"""
+        self._execute(
+            "UPDATE subscriptions SET is_live = ?, last_live_id = COALESCE(?, last_live_id), last_checked = ? "
+            "WHERE guild_id = ? AND user_id = ?",
+            (int(is_live), live_id or None, datetime.now().isoformat(), str(guild_id), str(user_id)),
+        )
+        self._dirty = True
+
+    def get_all_tracked_accounts(self) -> List[Dict]:
+        """Récupère tous les comptes à surveiller"""
+        return [self._account(row) for row in self._query("SELECT * FROM subscriptions")]
+
+    def get_subscriptions(self, tiktok_username: str) -> List[Dict]:
+        """Récupère tous les abonnements (guild, utilisateur) à un compte TikTok"""
+        rows = self._query(
+            "SELECT * FROM subscriptions WHERE username_key = ?", (self._username_key(tiktok_username),)
+        )
+        return [self._account(row) for row in rows]
+
+    def get_account_state(self, tiktok_username: str) -> Dict:
+        """Récupère l'état de suivi d'un compte TikTok (copie)"""
+        rows = self._query(
+            "SELECT state FROM accounts WHERE username_key = ?", (self._username_key(tiktok_username),)
+        )
+        return json.loads(rows[0]["state"]) if rows else {}
+
+    def update_account_state(self, tiktok_username: str, state: Dict):
+        """Enregistre l'état de suivi d'un compte TikTok encore surveillé"""
+        if not self.is_tracked(tiktok_username):
+            return
+        self._execute(
+            "INSERT OR REPLACE INTO accounts (username_key, state) VALUES (?, ?)",
+            (self._username_key(tiktok_username), json.dumps(state)),
+        )
+        self._dirty = True
+
+    def is_tracked(self, tiktok_username: str) -> bool:
+        """Vrai si au moins un utilisateur a lié ce compte TikTok"""
+        return self._username_key(tiktok_username) in self._tracked
+
+    def get_tracked_usernames(self) -> List[str]:
+        """Comptes TikTok distincts à surveiller (un seul fetch par compte et par cycle)"""
+        return list(self._tracked)
+
+    def import_data(self, data: Dict):
+        """Importe le contenu de tiktok_linked.json (remplace le contenu existant)"""
+        conn = self._conn
+        with self._lock, conn:
+            for table in ("guilds", "subscriptions", "accounts"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.executemany(
+                "INSERT INTO guilds (guild_id, notification_channel) VALUES (?, ?)",
+                [
+                    (guild_str, guild_data.get("notification_channel"))
+                    for guild_str, guild_data in data.get("guilds", {}).items()
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO subscriptions "
+                "(guild_id, user_id, tiktok_username, username_key, linked_at, last_checked, last_video_id, is_live, last_live_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        guild_str, user_str, u["tiktok_username"], self._username_key(u["tiktok_username"]),
+                        u.get("linked_at"), u.get("last_checked"), u.get("last_video_id"),
+                        int(bool(u.get("is_live", False))), u.get("last_live_id"),
+                    )
+                    for guild_str, guild_data in data.get("guilds", {}).items()
+                    for user_str, u in guild_data.get("linked_users", {}).items()
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO accounts (username_key, state) VALUES (?, ?)",
+                [(key, json.dumps(state)) for key, state in data.get("accounts", {}).items()],
+            )
+            self._tracked = {}
+            for row in conn.execute("SELECT username_key, COUNT(*) AS n FROM subscriptions GROUP BY username_key"):
+                self._tracked[row["username_key"]] = row["n"]
+
+
+def migrate_from_json(json_file: str, db_file: str) -> SQLiteTikTokTracker:
+    """Migration unique de tiktok_linked.json vers SQLite"""
+    source = TikTokTracker(json_file)
+    target = SQLiteTikTokTracker(db_file)
+    target.import_data(source.data)
+    print(
+        f"✅ Migration terminée : {len(target.get_all_tracked_accounts())} compte(s) lié(s), "
+        f"{len(target.get_tracked_usernames())} compte(s) TikTok importés dans {db_file}"
+    )
+    return target
+
+
+if __name__ == "__main__":
+    # Usage : python -m utils.tiktok_tracker_sqlite [data/tiktok_linked.json] [data/tiktok_linked.sqlite3]
+    bot_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    src = sys.argv[1] if len(sys.argv) > 1 else os.path.join(bot_dir, "data", "tiktok_linked.json")
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.join(bot_dir, "data", "tiktok_linked.sqlite3")
+    migrate_from_json(src, dst)
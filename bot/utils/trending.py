@@ -0,0 +1,83 @@
+import bisect
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Demi-vie de la popularité : un téléchargement vaut moitié moins après ce délai
+HALF_LIFE_HOURS = float(os.getenv("STATS_TRENDING_HALF_LIFE_HOURS", 48))
+TOP_K = int(os.getenv("STATS_TRENDING_TOP_K", 20))
+# Origine des temps fixe : les clés ne dépendent jamais de l'heure courante
+EPOCH = 1_700_000_000
+
+
+def logaddexp(a: Optional[float], b: float) -> float:
+    """log(exp(a) + exp(b)) sans débordement"""
+    if a is None:
+        return b
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+
+class TrendingIndex:
+    """Score de tendance à décroissance exponentielle, sans rescan périodique
+
+    score(t) = Σ exp(-λ (t - t_i)) sur les téléchargements t_i. On stocke
+    la clé log Σ exp(λ (t_i - EPOCH)) : elle ne bouge qu'au téléchargement
+    et l'ordre entre deux vidéos ne change pas avec le temps (décroissance
+    "paresseuse"). Le score réel se déduit à la lecture :
+    exp(clé - λ (t - EPOCH)).
+
+    Les clés ne faisant qu'augmenter, un top-K borné par plateforme reste
+    exact : une vidéo ne peut y entrer que lors de son propre téléchargement.
+    """
+
+    def __init__(self, half_life_hours: float = HALF_LIFE_HOURS, top_k: int = TOP_K):
+        self.decay = math.log(2) / (half_life_hours * 3600)
+        self.top_k = top_k
+        self._keys: Dict[str, float] = {}
+        # plateforme -> [(-clé, url)] trié (meilleur en premier), au plus top_k entrées
+        self._top: Dict[str, List[Tuple[float, str]]] = {}
+
+    def event_key(self, timestamp: float) -> float:
+        """Contribution d'un téléchargement en espace logarithmique"""
+        return self.decay * (timestamp - EPOCH)
+
+    def key(self, video_url: str) -> Optional[float]:
+        return self._keys.get(video_url)
+
+    def add(self, video_url: str, platform: str, timestamp: float) -> float:
+        """Comptabilise un téléchargement ; retourne la nouvelle clé"""
+        key = logaddexp(self._keys.get(video_url), self.event_key(timestamp))
+        self.set(video_url, platform, key)
+        return key
+
+    def set(self, video_url: str, platform: str, key: float):
+        """Fixe la clé d'une vidéo (chargement depuis le disque)"""
+        previous = self._keys.get(video_url)
+        self._keys[video_url] = key
+
+        top = self._top.setdefault(platform, [])
+        if previous is not None:
+            index = bisect.bisect_left(top, (-previous, video_url))
+            if index < len(top) and top[index][1] == video_url:
+                del top[index]
+        if len(top) < self.top_k or -key < top[-1][0]:
+            bisect.insort(top, (-key, video_url))
+            del top[self.top_k:]
+
+    def remove(self, video_url: str):
+        """Oublie la clé d'une vidéo (hors du top-K, ex. archivée)"""
+        self._keys.pop(video_url, None)
+
+    def score(self, key: float, now: Optional[float] = None) -> float:
+        now = now if now is not None else time.time()
+        return math.exp(key - self.event_key(now))
+
+    def top(self, platform: Optional[str] = None, limit: int = 10, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Vidéos tendance (toutes plateformes si `platform` est None) avec leur score"""
+        if platform is not None:
+            entries = self._top.get(platform, [])
+        else:
+            entries = sorted(entry for top in self._top.values() for entry in top)
+        return [(url, self.score(-neg_key, now)) for neg_key, url in entries[:limit]]
@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import math
+import os
+import sys
+from array import array
+from typing import Iterable, Optional
+
+# Au-delà de ce nombre d'utilisateurs distincts, une vidéo passe en mode
+# HyperLogLog (estimation, ~3 % d'erreur, 1 Ko fixe). 0 = toujours exact.
+HLL_THRESHOLD = int(os.getenv("STATS_HLL_THRESHOLD", 5000))
+HLL_PRECISION = 10
+HLL_REGISTERS = 1 << HLL_PRECISION
+
+
+def _hash64(user_id: int) -> int:
+    digest = hashlib.blake2b(user_id.to_bytes(8, "little", signed=False), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class UniqueUsers:
+    """Ensemble compact des utilisateurs distincts ayant téléchargé une vidéo
+
+    En mémoire : un set d'entiers (ajout en O(1)). Sur disque : tableau
+    trié d'entiers 64 bits encodé en base64 ("s:..."), soit environ deux
+    fois moins qu'une liste JSON d'IDs. Les vidéos très populaires passent
+    en HyperLogLog ("h:...", 1 Ko quel que soit le nombre d'utilisateurs).
+    """
+
+    __slots__ = ("_ids", "_registers")
+
+    def __init__(self):
+        self._ids: Optional[set] = set()
+        self._registers: Optional[bytearray] = None
+
+    @classmethod
+    def from_ids(cls, user_ids: Iterable) -> "UniqueUsers":
+        """Construit l'ensemble depuis une liste d'IDs (ancien format downloaded_by)"""
+        unique = cls()
+        for user_id in user_ids:
+            unique.add(user_id)
+        return unique
+
+    @classmethod
+    def decode(cls, encoded: str) -> "UniqueUsers":
+        """Reconstruit l'ensemble depuis sa forme encodée"""
+        unique = cls()
+        if not encoded:
+            return unique
+        kind, payload = encoded.split(":", 1)
+        raw = base64.b64decode(payload)
+        if kind == "h":
+            unique._ids = None
+            unique._registers = bytearray(raw)
+        else:
+            ids = array("Q")
+            ids.frombytes(raw)
+            if sys.byteorder == "big":
+                ids.byteswap()
+            unique._ids = set(ids)
+        return unique
+
+    @property
+    def is_estimate(self) -> bool:
+        return self._registers is not None
+
+    def add(self, user_id) -> bool:
+        """Ajoute un utilisateur ; retourne True s'il n'était pas (probablement) présent"""
+        user_id = int(user_id)
+        if self._registers is not None:
+            return self._add_hll(user_id)
+        if user_id in self._ids:
+            return False
+        self._ids.add(user_id)
+        if HLL_THRESHOLD and len(self._ids) > HLL_THRESHOLD:
+            self._to_hll()
+        return True
+
+    def _add_hll(self, user_id: int) -> bool:
+        hashed = _hash64(user_id)
+        index = hashed >> (64 - HLL_PRECISION)
+        rest = hashed & ((1 << (64 - HLL_PRECISION)) - 1)
+        rank = (64 - HLL_PRECISION) - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+            return True
+        return False
+
+    def _to_hll(self):
+        ids = self._ids
+        self._ids = None
+        self._registers = bytearray(HLL_REGISTERS)
+        for user_id in ids:
+            self._add_hll(user_id)
+
+    def __iter__(self):
+        """IDs exacts des utilisateurs (aucun en mode HyperLogLog)"""
+        return iter(self._ids or ())
+
+    def __len__(self) -> int:
+        if self._registers is None:
+            return len(self._ids)
+        m = HLL_REGISTERS
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Correction petits effectifs
+        return int(round(estimate))
+
+    def encode(self) -> str:
+        """Forme compacte pour stats.json"""
+        if self._registers is not None:
+            return "h:" + base64.b64encode(bytes(self._registers)).decode("ascii")
+        ids = array("Q", sorted(self._ids))
+        if sys.byteorder == "big":
+            ids.byteswap()
+        return "s:" + base64.b64encode(ids.tobytes()).decode("ascii")
@@ -0,0 +1,117 @@
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class VideoArchive:
+    """Segment disque des fiches vidéo froides (une ligne JSON par vidéo)
+
+    Seul l'index url -> [offset, longueur] reste en mémoire (il est
+    sauvegardé dans le checkpoint) ; une fiche n'est relue que lors d'une
+    consultation explicite ou d'un nouveau téléchargement de la vidéo.
+
+    Les lignes des vidéos réchauffées restent dans le segment jusqu'au
+    compactage. Celui-ci écrit un nouveau segment numéroté : l'ancien n'est
+    supprimé qu'une fois le checkpoint pointant vers le nouveau écrit.
+    """
+
+    def __init__(self, base_path: str, state: Optional[Dict] = None):
+        state = state or {}
+        self._base_path = base_path
+        self.generation: int = state.get("generation", 0)
+        self._index: Dict[str, List[int]] = dict(state.get("index", {}))
+        self._stale: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        return f"{self._base_path}.{self.generation}.jsonl"
+
+    def __contains__(self, video_url: str) -> bool:
+        return video_url in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def to_dict(self) -> Dict:
+        """Forme sérialisable (copie), pour le checkpoint"""
+        return {"generation": self.generation, "index": dict(self._index)}
+
+    def read(self, video_url: str) -> Optional[Dict]:
+        """Relit la fiche d'une vidéo archivée"""
+        entry = self._index.get(video_url)
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            line = json.loads(f.read(length).decode("utf-8"))
+        return line["record"]
+
+    def records(self, index: Optional[Dict[str, List[int]]] = None) -> Iterator[Tuple[str, Dict]]:
+        """Parcourt toutes les fiches vivantes (export complet), dans l'ordre du fichier"""
+        index = index if index is not None else self._index
+        if not index:
+            return
+        with open(self.path, "rb") as f:
+            for url, (offset, length) in sorted(index.items(), key=lambda item: item[1][0]):
+                f.seek(offset)
+                yield url, json.loads(f.read(length).decode("utf-8"))["record"]
+
+    def append(self, records: Dict[str, Dict]) -> Dict[str, List[int]]:
+        """Ajoute des fiches au segment (thread d'écriture) ; retourne leurs entrées d'index
+
+        L'index n'est pas modifié ici : l'appelant fusionne les entrées
+        avec `add_entries` une fois revenu sur la boucle.
+        """
+        entries: Dict[str, List[int]] = {}
+        if not records:
+            return entries
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            for url, record in records.items():
+                line = json.dumps({"url": url, "record": record}, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+                f.write(line + b"\n")
+                entries[url] = [offset, len(line)]
+                offset += len(line) + 1
+            f.flush()
+            os.fsync(f.fileno())
+        return entries
+
+    def add_entries(self, entries: Dict[str, List[int]]):
+        self._index.update(entries)
+
+    def discard(self, video_url: str):
+        """Retire une vidéo de l'index (elle redevient chaude)"""
+        self._index.pop(video_url, None)
+
+    def needs_compaction(self) -> bool:
+        """Vrai quand plus de la moitié des octets du segment sont morts"""
+        if not os.path.exists(self.path):
+            return False
+        size = os.path.getsize(self.path)
+        live = sum(length + 1 for _, length in self._index.values())
+        return size > 0 and live * 2 < size
+
+    def compact(self):
+        """Recopie les fiches vivantes dans un nouveau segment
+
+        L'ancien segment est conservé jusqu'à `remove_stale`, à appeler
+        après l'écriture du checkpoint qui référence le nouveau.
+        """
+        old_path = self.path
+        self.generation += 1
+        new_index: Dict[str, List[int]] = {}
+        with open(old_path, "rb") as src, open(self.path, "wb") as dst:
+            for url, (offset, length) in self._index.items():
+                src.seek(offset)
+                new_index[url] = [dst.tell(), length]
+                dst.write(src.read(length) + b"\n")
+            dst.flush()
+            os.fsync(dst.fileno())
+        self._index = new_index
+        self._stale = old_path
+
+    def remove_stale(self):
+        if self._stale and os.path.exists(self._stale):
+            os.remove(self._stale)
+        self._stale = None
@@ -0,0 +1,123 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+class WriteBehindQueue:
+    """File d'écriture différée : enqueue en O(1), écriture groupée en tâche de fond
+
+    Les événements sont vidés par lots toutes les `batch_size` entrées ou
+    toutes les `flush_interval` secondes, via `flush_callback` (une coroutine
+    qui reçoit la liste des événements du lot).
+    """
+
+    def __init__(
+        self,
+        flush_callback: Callable[[List[Dict]], Awaitable[None]],
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        name: str = "stats",
+    ):
+        self.flush_callback = flush_callback
+        self.batch_size = batch_size or int(os.getenv("STATS_FLUSH_EVERY", 100))
+        self.flush_interval = flush_interval or float(os.getenv("STATS_FLUSH_INTERVAL", 5))
+        self.name = name
+        self._pending: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Métriques exposées via /health
+        self.flushes = 0
+        self.events_flushed = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.last_flush_at: Optional[float] = None
+
+    def start(self):
+        """Démarre la tâche d'écriture (nécessite une boucle asyncio active)"""
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def enqueue(self, event: Dict):
+        """Ajoute un événement à écrire (O(1), ne touche jamais le disque)"""
+        self._pending.append(event)
+        if self._task is None or self._task.done():
+            self.start()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    async def _run(self):
+        """Boucle de fond : vide la file par lots"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending:
+                await self.flush()
+
+    async def flush(self):
+        """Écrit immédiatement tous les événements en attente"""
+        async with self._flush_lock:
+            batch = list(self._pending)
+            self._pending.clear()
+
+            start = time.perf_counter()
+            try:
+                await self.flush_callback(batch)
+            except Exception as e:
+                # Remettre le lot en tête de file pour la prochaine tentative
+                self._pending.extendleft(reversed(batch))
+                self.errors += 1
+                print(f"⚠️ Écriture différée '{self.name}' échouée ({len(batch)} événements en attente) : {e}")
+                return
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.flushes += 1
+            self.events_flushed += len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.last_flush_at = time.time()
+
+            if len(self._pending) > self.batch_size * 10:
+                print(f"⚠️ Écriture différée '{self.name}' en retard : {len(self._pending)} événements en attente")
+
+    async def close(self):
+        """Arrête la tâche de fond et vide entièrement la file"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception as e:
+                print(f"⚠️ Arrêt de l'écriture différée '{self.name}' : {e}")
+            self._task = None
+        while self._pending:
+            pending_before = len(self._pending)
+            await self.flush()
+            if len(self._pending) >= pending_before:
+                print(f"❌ {len(self._pending)} événements '{self.name}' n'ont pas pu être écrits")
+                break
+
+    def metrics(self) -> Dict:
+        """Profondeur de file et latence d'écriture"""
+        return {
+            "queue_depth": len(self._pending),
+            "flushes": self.flushes,
+            "events_flushed": self.events_flushed,
+            "errors": self.errors,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "last_flush_at": self.last_flush_at,
+        }